@@ -1,10 +1,20 @@
 import streamlit as st
+import sys
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableLambda, RunnablePassthrough, RunnableParallel
-from operator import itemgetter
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.callbacks import BaseCallbackHandler
+import time
+import io
+import re
+import zipfile
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.accounting import enable_accounting, render_accounting_sidebar
 
 # Page config
 st.set_page_config(
@@ -13,6 +23,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day003_JokeSetup&BlogTopic")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -55,10 +68,10 @@ This app generates blog content in 3 steps:
 """)
 
 # Initialize LLM
-@st.cache_resource
 def initialize_llm(temperature=0.4):
-    """Initialize the LLM with caching"""
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=temperature)
+    """Get the shared, process-wide cached LLM client"""
+    return get_chat_model("gemini-2.5-flash", temperature=temperature,
+                          rate_limiter=get_rate_limiter("gemini").for_langchain("interactive"))
 
 # Initialize chains
 @st.cache_resource
@@ -72,9 +85,6 @@ def initialize_chains(_llm):
     )
     topic_chain = topic_prompt | _llm | StrOutputParser()
     
-    # Bridge: str -> {"topic": str}
-    to_topic_dict = RunnableLambda(lambda s: {"topic": s})
-    
     # Step 2: Title generator
     title_prompt = PromptTemplate.from_template(
         "Given this blog topic: {topic}\n"
@@ -82,9 +92,6 @@ def initialize_chains(_llm):
     )
     title_chain = title_prompt | _llm | StrOutputParser()
     
-    # Bridge: str -> {"title": str}
-    to_title_dict = RunnableLambda(lambda s: {"title": s})
-    
     # Step 3: Summary generator
     summary_prompt = PromptTemplate.from_template(
         "Based on this blog title: {title}\n"
@@ -92,16 +99,43 @@ def initialize_chains(_llm):
     )
     summary_chain = summary_prompt | _llm | StrOutputParser()
     
-    # Compose full pipeline
-    full_pipeline = RunnableParallel({
-        "domain": RunnablePassthrough() | RunnableLambda(itemgetter("domain")),
-        "topic": topic_chain,  # expects {"domain"}
-        "title": topic_chain | to_topic_dict | title_chain,
-        "summary": topic_chain | to_topic_dict | title_chain | to_title_dict | summary_chain,
-    })
+    # Compose full pipeline as a DAG: each stage runs once and its output is
+    # carried forward in the state dict, so downstream stages reuse it instead
+    # of regenerating it. {"domain"} -> +topic -> +title -> +summary
+    full_pipeline = (
+        RunnablePassthrough.assign(topic=topic_chain)
+        | RunnablePassthrough.assign(title=title_chain)
+        | RunnablePassthrough.assign(summary=summary_chain)
+    )
     
     return full_pipeline
 
+# Callback that records every LLM call made during a pipeline run
+class LLMCallTracer(BaseCallbackHandler):
+    """Collects one trace entry (prompt preview, latency) per LLM call"""
+    
+    def __init__(self):
+        self.calls = []
+        self._started = {}
+    
+    def _start(self, run_id, prompt):
+        self._started[run_id] = (time.perf_counter(), prompt)
+    
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, prompts[0] if prompts else "")
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        first = messages[0][-1].content if messages and messages[0] else ""
+        self._start(run_id, first if isinstance(first, str) else str(first))
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, prompt = self._started.pop(run_id, (time.perf_counter(), ""))
+        self.calls.append({
+            "call": len(self.calls) + 1,
+            "prompt": prompt.splitlines()[0][:80] if prompt else "",
+            "latency_s": round(time.perf_counter() - started, 2),
+        })
+
 # Helper function to format markdown
 def to_markdown(res: dict) -> str:
     """Convert result dictionary to markdown format"""
@@ -118,6 +152,23 @@ def to_markdown(res: dict) -> str:
 {res['summary']}
 """
 
+# Helper function to bundle many drafts
+def to_bundle(results: list) -> bytes:
+    """Zip one markdown file per draft plus a combined all_drafts.md"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, res in enumerate(results, 1):
+            slug = re.sub(r"[^a-z0-9]+", "-", res["domain"].lower()).strip("-") or "draft"
+            zf.writestr(f"{i:03d}_{slug}.md", to_markdown(res))
+        zf.writestr("all_drafts.md", "\n---\n\n".join(to_markdown(res) for res in results))
+    return buffer.getvalue()
+
+# Initialize session state for batch results (kept if a run is stopped midway)
+if "batch_results" not in st.session_state:
+    st.session_state.batch_results = []
+if "batch_errors" not in st.session_state:
+    st.session_state.batch_errors = []
+
 # Main UI
 st.title("📝 Blog Topic → Title → Summary Generator")
 st.markdown("Generate a complete blog outline from a domain using AI-powered chains.")
@@ -141,13 +192,14 @@ if st.button("🚀 Generate Blog Content", type="primary"):
                 pipeline = initialize_chains(llm)
                 
                 # Run the pipeline
-                result = pipeline.invoke({"domain": domain})
+                tracer = LLMCallTracer()
+                result = pipeline.invoke({"domain": domain}, config={"callbacks": [tracer]})
                 
                 # Display results
                 st.success("✅ Blog content generation completed!")
                 
                 # Create tabs for organized output
-                tab1, tab2, tab3 = st.tabs(["📄 Formatted Output", "📊 Individual Components", "📝 Markdown View"])
+                tab1, tab2, tab3, tab4 = st.tabs(["📄 Formatted Output", "📊 Individual Components", "📝 Markdown View", "🔍 Trace"])
                 
                 with tab1:
                     st.markdown("### ✨ Complete Blog Draft")
@@ -183,11 +235,92 @@ if st.button("🚀 Generate Blog Content", type="primary"):
                     # Copy to clipboard button
                     st.code(to_markdown(result), language="markdown")
                 
+                with tab4:
+                    st.markdown("### 🔍 LLM Calls for This Request")
+                    st.metric("LLM calls", len(tracer.calls))
+                    st.dataframe(tracer.calls, hide_index=True, use_container_width=True)
+                
             except Exception as e:
                 st.error(f"❌ Error generating content: {str(e)}")
                 with st.expander("🔍 Error Details"):
                     st.exception(e)
 
+# Batch mode
+st.markdown("---")
+st.markdown("## 📚 Batch Mode")
+st.markdown("Generate drafts for many domains at once. Completed drafts are kept even if you stop the run.")
+
+domains_text = st.text_area(
+    "Domains (one per line):",
+    value="Productivity\nPersonal Finance\nRemote Work",
+    height=150
+)
+batch_col1, batch_col2 = st.columns(2)
+with batch_col1:
+    max_concurrency = st.number_input("Max concurrency", min_value=1, max_value=32, value=5,
+                                      help="Number of pipelines running at the same time")
+with batch_col2:
+    max_attempts = st.number_input("Max attempts per domain", min_value=1, max_value=6, value=3,
+                                   help="Failed pipelines are retried with jittered exponential backoff")
+
+if st.button("📚 Generate Batch"):
+    domains = [d.strip() for d in domains_text.splitlines() if d.strip()]
+    if not domains:
+        st.error("Please enter at least one domain!")
+    else:
+        st.session_state.batch_results = []
+        st.session_state.batch_errors = []
+        
+        llm = initialize_llm(temperature=temperature)
+        pipeline = initialize_chains(llm).with_retry(
+            stop_after_attempt=int(max_attempts),
+            wait_exponential_jitter=True
+        )
+        
+        progress = st.progress(0.0, text=f"Generating {len(domains)} drafts...")
+        stats = st.empty()
+        started = time.perf_counter()
+        
+        # Results are streamed in completion order and saved immediately
+        for done, (idx, output) in enumerate(pipeline.batch_as_completed(
+            [{"domain": d} for d in domains],
+            config={"max_concurrency": int(max_concurrency)},
+            return_exceptions=True
+        ), 1):
+            if isinstance(output, Exception):
+                st.session_state.batch_errors.append({"domain": domains[idx], "error": str(output)})
+            else:
+                st.session_state.batch_results.append(output)
+            
+            elapsed = time.perf_counter() - started
+            progress.progress(done / len(domains), text=f"Completed {done}/{len(domains)}: {domains[idx]}")
+            stats.markdown(
+                f"⏱️ {elapsed:.1f}s elapsed · 🚀 {done / elapsed * 60:.1f} drafts/min · "
+                f"❌ {len(st.session_state.batch_errors)} failed"
+            )
+
+if st.session_state.batch_results or st.session_state.batch_errors:
+    st.success(f"✅ {len(st.session_state.batch_results)} drafts ready")
+    
+    if st.session_state.batch_results:
+        st.download_button(
+            label="📥 Download All Drafts (ZIP)",
+            data=to_bundle(st.session_state.batch_results),
+            file_name="blog_drafts.zip",
+            mime="application/zip"
+        )
+        with st.expander("📄 Drafts", expanded=False):
+            for res in st.session_state.batch_results:
+                st.markdown(to_markdown(res))
+                st.markdown("---")
+    
+    if st.session_state.batch_errors:
+        with st.expander(f"❌ Failed Domains ({len(st.session_state.batch_errors)})"):
+            st.dataframe(st.session_state.batch_errors, hide_index=True, use_container_width=True)
+
+# Token usage and estimated cost
+render_accounting_sidebar("day003_JokeSetup&BlogTopic")
+
 # Footer
 st.markdown("---")
 st.markdown(
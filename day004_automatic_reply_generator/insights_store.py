@@ -0,0 +1,184 @@
+"""
+Incremental insights store for analysed reviews.
+
+Every analysed review is appended to a SQLite log, and the running
+aggregates (sentiment distribution, rating histogram, pros/cons
+frequencies) are updated in the same transaction. The dashboard reads
+the aggregate tables only, so it never re-runs an LLM call and never
+scans the raw log.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = "review_insights.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    batch_id TEXT,
+    sentiment TEXT NOT NULL,
+    stars INTEGER,
+    review TEXT NOT NULL,
+    analysis_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sentiment_counts (
+    sentiment TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rating_counts (
+    stars INTEGER PRIMARY KEY,
+    n INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS term_counts (
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (kind, term)
+);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    stars_sum INTEGER NOT NULL,
+    stars_n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sentiment)
+);
+"""
+
+SENTIMENTS = ("Positive", "Negative", "Mixed", "Neutral")
+
+
+def normalise_sentiment(value: str) -> str:
+    """Map free-form LLM sentiment output onto one of SENTIMENTS."""
+    text = (value or "").strip().lower()
+    for label in SENTIMENTS:
+        if label.lower() in text:
+            return label
+    return "Neutral"
+
+
+def normalise_term(term) -> str:
+    """Lower-case and collapse whitespace so 'Battery life ' == 'battery life'."""
+    return " ".join(str(term).lower().split()).strip(" .")
+
+
+def _stars(rating):
+    try:
+        stars = int(rating.get("stars"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return stars if 1 <= stars <= 5 else None
+
+
+class InsightsStore:
+    """Append-only review log with incrementally maintained aggregates."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(daily_counts)")}
+        if "stars_n" in columns:
+            return
+        # Older stores counted unrated reviews as 0 stars; rebuild the rated count from the log
+        with self._conn:
+            self._conn.execute("ALTER TABLE daily_counts ADD COLUMN stars_n INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "UPDATE daily_counts SET stars_n = (SELECT COUNT(stars) FROM reviews r "
+                "WHERE date(r.created_at, 'unixepoch', 'localtime') = daily_counts.day "
+                "AND r.sentiment = daily_counts.sentiment)"
+            )
+
+    def record(self, result: dict, batch_id: str = None) -> None:
+        """Record one analysis result (the dict returned by the pipeline)."""
+        self.record_many([result], batch_id=batch_id)
+
+    def record_many(self, results, batch_id: str = None) -> int:
+        """Append a batch of analysis results in a single transaction."""
+        now = time.time()
+        day = time.strftime("%Y-%m-%d", time.localtime(now))
+        count = 0
+        with self._lock, self._conn:
+            for result in results:
+                sentiment = normalise_sentiment(result.get("sentiment", ""))
+                stars = _stars(result.get("rating"))
+                self._conn.execute(
+                    "INSERT INTO reviews (created_at, batch_id, sentiment, stars, review, analysis_json) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (now, batch_id, sentiment, stars, result.get("review", ""), json.dumps(result)),
+                )
+                self._bump("sentiment_counts", ("sentiment",), (sentiment,))
+                if stars is not None:
+                    self._bump("rating_counts", ("stars",), (stars,))
+                for kind in ("pros", "cons"):
+                    terms = {normalise_term(t) for t in result.get(kind) or []}
+                    for term in terms - {""}:
+                        self._bump("term_counts", ("kind", "term"), (kind, term))
+                self._conn.execute(
+                    "INSERT INTO daily_counts (day, sentiment, n, stars_sum, stars_n) VALUES (?, ?, 1, ?, ?) "
+                    "ON CONFLICT (day, sentiment) DO UPDATE SET n = n + 1, "
+                    "stars_sum = stars_sum + excluded.stars_sum, stars_n = stars_n + excluded.stars_n",
+                    (day, sentiment, stars or 0, int(stars is not None)),
+                )
+                count += 1
+        return count
+
+    def _bump(self, table, key_cols, key_values):
+        cols = ", ".join(key_cols)
+        placeholders = ", ".join("?" for _ in key_cols)
+        self._conn.execute(
+            f"INSERT INTO {table} ({cols}, n) VALUES ({placeholders}, 1) "
+            f"ON CONFLICT ({cols}) DO UPDATE SET n = n + 1",
+            key_values,
+        )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def total_reviews(self) -> int:
+        rows = self._query("SELECT COALESCE(SUM(n), 0) FROM sentiment_counts")
+        return rows[0][0]
+
+    def sentiment_distribution(self) -> dict:
+        counts = dict(self._query("SELECT sentiment, n FROM sentiment_counts"))
+        return {label: counts.get(label, 0) for label in SENTIMENTS}
+
+    def rating_histogram(self) -> dict:
+        counts = dict(self._query("SELECT stars, n FROM rating_counts"))
+        return {stars: counts.get(stars, 0) for stars in range(1, 6)}
+
+    def average_rating(self):
+        rows = self._query("SELECT SUM(stars * n), SUM(n) FROM rating_counts")
+        total, n = rows[0]
+        return round(total / n, 2) if n else None
+
+    def top_terms(self, kind: str, limit: int = 10) -> list:
+        """Most frequent pros or cons as (term, count) pairs."""
+        return self._query(
+            "SELECT term, n FROM term_counts WHERE kind = ? ORDER BY n DESC, term LIMIT ?",
+            (kind, limit),
+        )
+
+    def daily_trend(self, days: int = 30) -> list:
+        """(day, sentiment, count, avg_stars) rows for the most recent days; avg_stars is None if none were rated."""
+        return self._query(
+            "SELECT day, sentiment, n, CAST(stars_sum AS REAL) / NULLIF(stars_n, 0) FROM daily_counts "
+            "WHERE day IN (SELECT DISTINCT day FROM daily_counts ORDER BY day DESC LIMIT ?) "
+            "ORDER BY day",
+            (days,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
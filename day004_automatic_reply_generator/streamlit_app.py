@@ -1,11 +1,23 @@
 import streamlit as st
+import sys
 import os
 import re
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
+import uuid
+import pandas as pd
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableParallel, RunnableLambda, RunnablePassthrough, RunnableBranch
+from insights_store import InsightsStore, DEFAULT_DB_PATH
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model, warm_up
+from utils.rate_limiter import get_rate_limiter, retrying, is_retryable, limiter_metrics, UsageCallback
+from utils.accounting import enable_accounting, render_accounting_sidebar
+
+# Insights DB location is a deployment setting, never a user input
+INSIGHTS_DB_PATH = os.environ.get("INSIGHTS_DB_PATH", DEFAULT_DB_PATH)
 
 # Page config
 st.set_page_config(
@@ -14,6 +26,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day004_automatic_reply_generator")
+
 # # Custom CSS for better styling
 # st.markdown("""
 #     <style>
@@ -88,13 +103,18 @@ This app analyzes customer reviews and generates:
 - 💬 Auto-generated reply
 """)
 
+# Shared per-key rate limiter; interactive requests overtake batch work
+gemini_limiter = get_rate_limiter("gemini", google_api_key)
+usage_callback = UsageCallback(gemini_limiter)
+
 # Initialize LLM
-@st.cache_resource
-def initialize_llm(temperature):
-    """Initialize the LLM with caching"""
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=temperature)
+def initialize_llm(temperature, priority="interactive"):
+    """Get the shared, process-wide cached LLM client"""
+    return get_chat_model("gemini-2.5-flash", temperature=temperature,
+                          rate_limiter=gemini_limiter.for_langchain(priority))
 
 llm = initialize_llm(temperature)
+warm_up(llm)
 parser = StrOutputParser()
 
 # Output contract schema
@@ -123,8 +143,11 @@ def coerce_json(s: str):
 
 # Initialize chains
 @st.cache_resource
-def initialize_chains(_llm, _parser):
-    """Initialize all LangChain chains"""
+def initialize_chains(_llm, _parser, llm_key):
+    """Initialize all LangChain chains (cached per llm_key, e.g. temperature and priority)"""
+    
+    # Retry throttled or transient failures per model call, not per pipeline
+    _llm = retrying(_llm)
     
     # Sentiment chain
     sentiment_pt = PromptTemplate.from_template(
@@ -281,7 +304,27 @@ REVIEW: {review}
     return final_pipeline
 
 # Initialize chains
-pipeline = initialize_chains(llm, parser)
+pipeline = initialize_chains(llm, parser, (temperature, "interactive"))
+batch_pipeline = initialize_chains(initialize_llm(temperature, "batch"), parser, (temperature, "batch"))
+
+# Insights store (shared across sessions)
+@st.cache_resource
+def get_insights_store(db_path):
+    """Open the incremental insights store once per process"""
+    return InsightsStore(db_path)
+
+store = get_insights_store(INSIGHTS_DB_PATH)
+
+# Helper function to read reviews from an uploaded file
+def read_uploaded_reviews(uploaded_file):
+    """Return a list of reviews from a CSV (``review`` column) or a TXT file (one per line)."""
+    if uploaded_file.name.lower().endswith(".csv"):
+        df = pd.read_csv(uploaded_file)
+        column = "review" if "review" in df.columns else df.columns[0]
+        reviews = df[column].dropna().astype(str).tolist()
+    else:
+        reviews = uploaded_file.getvalue().decode("utf-8").splitlines()
+    return [r.strip() for r in reviews if r.strip()]
 
 # Main UI
 st.title("💬 Automated Customer Review Insight & Reply Generator")
@@ -303,7 +346,8 @@ if st.button("🚀 Analyze Review & Generate Reply", type="primary"):
         with st.spinner("🔄 Analyzing review and generating insights..."):
             try:
                 # Process the review
-                result = pipeline.invoke({"review": review})
+                result = pipeline.invoke({"review": review}, config={"callbacks": [usage_callback]})
+                store.record({**result, "review": review})
                 
                 # Display results
                 st.success("✅ Analysis completed!")
@@ -383,10 +427,94 @@ if st.button("🚀 Analyze Review & Generate Reply", type="primary"):
                     )
                 
             except Exception as e:
-                st.error(f"❌ Error analyzing review: {str(e)}")
+                if is_retryable(e):
+                    st.error("⏳ Gemini is rate limiting this API key and retries were exhausted. Please try again shortly.")
+                else:
+                    st.error(f"❌ Error analyzing review: {str(e)}")
                 with st.expander("🔍 Error Details"):
                     st.exception(e)
 
+# Batch analysis
+st.markdown("---")
+st.markdown("## 📦 Batch Analysis")
+st.markdown("Upload many reviews; every result is appended to the insights store.")
+
+batch_col1, batch_col2 = st.columns([3, 1])
+with batch_col1:
+    batch_file = st.file_uploader("Reviews file (CSV with a `review` column, or TXT with one review per line)",
+                                  type=["csv", "txt"])
+with batch_col2:
+    batch_concurrency = st.number_input("Max concurrency", min_value=1, max_value=16, value=4)
+    batch_chunk_size = st.number_input("Chunk size", min_value=1, max_value=500, value=20)
+
+if batch_file is not None and st.button("📦 Analyze Batch"):
+    reviews = read_uploaded_reviews(batch_file)
+    batch_id = uuid.uuid4().hex[:8]
+    progress = st.progress(0.0, text=f"Analyzing {len(reviews)} reviews...")
+    recorded, failed = 0, 0
+    for start in range(0, len(reviews), int(batch_chunk_size)):
+        chunk = reviews[start:start + int(batch_chunk_size)]
+        outputs = batch_pipeline.batch(
+            [{"review": r} for r in chunk],
+            config={"max_concurrency": int(batch_concurrency), "callbacks": [usage_callback]},
+            return_exceptions=True,
+        )
+        ok = [{**out, "review": r} for r, out in zip(chunk, outputs) if not isinstance(out, Exception)]
+        recorded += store.record_many(ok, batch_id=batch_id)
+        failed += len(chunk) - len(ok)
+        done = start + len(chunk)
+        progress.progress(done / len(reviews), text=f"Analyzed {done}/{len(reviews)} reviews")
+    st.success(f"✅ Batch {batch_id}: recorded {recorded} reviews ({failed} failed)")
+
+# Insights dashboard (reads aggregates only, no LLM calls)
+st.markdown("---")
+st.markdown("## 📈 Insights Dashboard")
+
+total_reviews = store.total_reviews()
+if not total_reviews:
+    st.info("No reviews analyzed yet. Results will appear here as reviews are processed.")
+else:
+    m1, m2, m3 = st.columns(3)
+    sentiments = store.sentiment_distribution()
+    m1.metric("Reviews analyzed", f"{total_reviews:,}")
+    m2.metric("Average rating", store.average_rating() or "–")
+    m3.metric("Positive share", f"{100 * sentiments['Positive'] / total_reviews:.0f}%")
+
+    d1, d2 = st.columns(2)
+    with d1:
+        st.markdown("### 📊 Sentiment Distribution")
+        st.bar_chart(pd.DataFrame({"reviews": sentiments}))
+    with d2:
+        st.markdown("### ⭐ Rating Histogram")
+        st.bar_chart(pd.DataFrame({"reviews": store.rating_histogram()}))
+
+    d3, d4 = st.columns(2)
+    with d3:
+        st.markdown("### ✅ Top Pros")
+        st.dataframe(pd.DataFrame(store.top_terms("pros"), columns=["pro", "count"]),
+                     hide_index=True, use_container_width=True)
+    with d4:
+        st.markdown("### ❌ Top Cons")
+        st.dataframe(pd.DataFrame(store.top_terms("cons"), columns=["con", "count"]),
+                     hide_index=True, use_container_width=True)
+
+    trend = pd.DataFrame(store.daily_trend(), columns=["day", "sentiment", "reviews", "avg_stars"])
+    if not trend.empty:
+        st.markdown("### 📅 Daily Sentiment Trend")
+        st.line_chart(trend.pivot_table(index="day", columns="sentiment", values="reviews", fill_value=0))
+
+# Rate limiter stats
+st.sidebar.markdown("---")
+st.sidebar.markdown("### 🚦 Rate Limits")
+for name, m in limiter_metrics().items():
+    st.sidebar.caption(
+        f"**{name}** · queue {m['queue_depth']} · avg wait {m['avg_wait_s']['interactive']:.1f}s interactive / "
+        f"{m['avg_wait_s']['batch']:.1f}s batch · {m['retries']} retries"
+    )
+
+# Token usage and estimated cost
+render_accounting_sidebar("day004_automatic_reply_generator")
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -0,0 +1,297 @@
+"""
+Load-testing and latency benchmark for the day009 API.
+
+Starts the app in-process with uvicorn, replaces the Gemini clients with
+fakes whose latency follows a log-normal distribution, and drives every
+endpoint with an async load generator at increasing concurrency. Reports
+RPS, p50/p95/p99 and error rate per endpoint and saves the results as
+JSON (tagged with the git commit) so runs can be compared.
+
+Usage (from day009_fastapi/):
+
+    python benchmark.py
+    python benchmark.py --concurrency 1,8,32 --duration 5 --llm-latency-ms 300
+    python benchmark.py --endpoints weather,classify --compare benchmark_results/<old>.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+import uvicorn
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import index
+from pipelines import (build_batch_sentiment_classifier, build_blog_pipeline, build_report_generator,
+                       build_review_analyzer)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results")
+
+# name -> (method, path, json body, streams SSE)
+ENDPOINTS = {
+    "health": ("GET", "/health", None, False),
+    "weather": ("GET", "/weather?city=Delhi", None, False),
+    "hello": ("GET", "/hello/Alex", None, False),
+    "classify": ("POST", "/reviews/classify", {"review": "Great battery, terrible screen."}, False),
+    "embed": ("POST", "/embed", {"text": "How long does the battery last?"}, False),
+    "review": ("POST", "/reviews/analyze", {"review": "Great battery, terrible screen."}, False),
+    "blog_stream": ("POST", "/blog/stream", {"domain": "urban gardening"}, True),
+    "report": ("POST", "/report", {"topic": "Urban obesity in India"}, False),
+    "task_create": ("POST", "/tasks/", {"title": "Benchmark task", "description": "load test"}, False),
+    "task_bulk": ("POST", "/tasks/bulk", {"tasks": [{"title": f"Benchmark task {i}"} for i in range(100)]}, False),
+    "task_list": ("GET", "/tasks/?completed=false&limit=50", None, False),
+}
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """Chat model that sleeps for a log-normal latency and returns canned, well-formed replies."""
+
+    median_ms: float = 200.0
+    sigma: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def _latency(self) -> float:
+        return random.lognormvariate(math.log(self.median_ms / 1000), self.sigma)
+
+    @staticmethod
+    def _reply(messages) -> str:
+        prompt = str(messages[-1].content)
+        batch = re.search(r"JSON array of exactly (\d+) labels", prompt)
+        if batch:
+            return json.dumps([random.choice(["Positive", "Negative", "Mixed", "Neutral"])
+                               for _ in range(int(batch.group(1)))])
+        if "ONE WORD ONLY" in prompt:
+            return random.choice(["Positive", "Negative", "Mixed", "Neutral"])
+        if "JSON object" in prompt:
+            return '{"stars": 4, "out_of": 5, "why": "Mostly positive"}'
+        if "JSON array" in prompt:
+            return '["long battery life", "bright screen", "fair price"]'
+        return "Lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor. " * 6
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._latency())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._latency())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        total = self._latency()
+        words = self._reply(messages).split(" ")
+        # ~30% of the latency before the first token, the rest spread over the tokens
+        await asyncio.sleep(total * 0.3)
+        for word in words:
+            await asyncio.sleep(total * 0.7 / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeLatencyEmbeddings:
+    """Embeddings client paying one sampled latency per upstream call, however many texts it carries."""
+
+    def __init__(self, median_ms: float, sigma: float):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self._inner = DeterministicFakeEmbedding(size=768)
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(random.lognormvariate(math.log(self.median_ms / 1000), self.sigma))
+        return self._inner.embed_documents(texts)
+
+
+def fake_clients(median_ms: float, sigma: float):
+    """Drop-in replacement for pipelines.build_clients backed by the fakes above."""
+    def build():
+        llm = FakeLatencyChatModel(median_ms=median_ms, sigma=sigma)
+        return {
+            "llm": llm,
+            "embeddings": FakeLatencyEmbeddings(median_ms, sigma),
+            "classify": build_batch_sentiment_classifier(llm),
+            "review": build_review_analyzer(llm),
+            "blog": build_blog_pipeline(llm),
+            "report": build_report_generator(llm),
+            "rag": None,
+        }
+    return build
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_level(client, endpoint: str, concurrency: int, duration: float) -> dict:
+    """Keep `concurrency` requests in flight against one endpoint for `duration` seconds."""
+    method, path, body, streams = ENDPOINTS[endpoint]
+    latencies, first_byte, errors = [], [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with client.stream(method, path, json=body) as response:
+                    failed = response.status_code >= 400
+                    seen_first = False
+                    async for chunk in response.aiter_bytes():
+                        if streams and not seen_first:
+                            first_byte.append(time.perf_counter() - started)
+                            seen_first = True
+                        if streams and b"event: error" in chunk:
+                            failed = True
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    first_byte.sort()
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p95_ms": 1000 * percentile(latencies, 95),
+        "p99_ms": 1000 * percentile(latencies, 99),
+    }
+    if streams:
+        result["ttfb_p50_ms"] = 1000 * percentile(first_byte, 50)
+    if method == "POST" and path.startswith("/tasks"):
+        # Sustained write throughput: tasks persisted per second (bulk requests carry many)
+        result["tasks_per_s"] = result["rps"] * len(body.get("tasks", [body])) * (1 - result["error_rate"])
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_benchmark(args) -> dict:
+    index.build_clients = fake_clients(args.llm_latency_ms, args.llm_latency_sigma)
+    index.TASKS_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="day009-bench-"), "tasks.db")
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(index.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    results = {}
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            for endpoint in args.endpoints:
+                results[endpoint] = {}
+                for concurrency in args.concurrency:
+                    level = await run_level(client, endpoint, concurrency, args.duration)
+                    results[endpoint][str(concurrency)] = level
+                    print(f"{endpoint:>12}  c={concurrency:<4} {level['rps']:>8.1f} rps  "
+                          f"p50 {level['p50_ms']:>7.1f}  p95 {level['p95_ms']:>7.1f}  p99 {level['p99_ms']:>7.1f} ms  "
+                          f"errors {level['error_rate']:.1%}"
+                          + (f"  {level['tasks_per_s']:.0f} tasks/s" if "tasks_per_s" in level else ""))
+            batching = (await client.get("/batching/stats")).json()
+    finally:
+        server.should_exit = True
+        await serving
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_latency_sigma": args.llm_latency_sigma,
+            "batch_window_ms": index.BATCH_WINDOW_MS,
+            "batch_max_size": index.BATCH_MAX_SIZE,
+        },
+        "results": results,
+        "batching": batching,
+    }
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Print RPS and p95 changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline.get('commit')} ({baseline_path})")
+    for endpoint, levels in current["results"].items():
+        for concurrency, level in levels.items():
+            old = baseline.get("results", {}).get(endpoint, {}).get(concurrency)
+            if not old:
+                continue
+            rps_change = (level["rps"] - old["rps"]) / old["rps"] if old["rps"] else 0.0
+            p95_change = (level["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+            print(f"{endpoint:>12}  c={concurrency:<4} rps {rps_change:+.1%}  p95 {p95_change:+.1%}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the day009 API with a mocked LLM.")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per endpoint and level")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Median mocked LLM latency")
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.5, help="Log-normal sigma of the latency")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmark_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run_benchmark(args))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
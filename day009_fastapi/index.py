@@ -1,11 +1,89 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from micro_batch import MicroBatcher
+from observability import (PROFILE_DIR, Metrics, MetricsMiddleware, StackSampler, UpstreamLatencyCallback,
+                           batcher_lines, monitor_event_loop, profile_lock, profiler_enabled, timed_upstream)
+from pipelines import build_clients
+from response_cache import ResponseCacheMiddleware, cache_from_env
+from task_store import DEFAULT_DB_PATH, IdempotencyConflict, TaskStore, request_fingerprint
+
+load_dotenv()
+
+# Micro-batching: requests arriving within the window share one upstream call
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+
+TASKS_DB_PATH = os.environ.get("TASKS_DB", DEFAULT_DB_PATH)
+RAG_DEFAULT_COLLECTION = "my_docs"
+
+metrics = Metrics()
+upstream_callback = UpstreamLatencyCallback(metrics)
+
+
+def run_config() -> dict:
+    """Run config for pipeline calls: times every LLM and tool call for /metrics."""
+    return {"callbacks": [upstream_callback]}
+
+
+def build_batchers(pipelines: dict) -> dict:
+    embeddings = pipelines["embeddings"]
+    classifier = pipelines["classify"]
+
+    async def classify_many(reviews):
+        # One upstream call labels the whole micro-batch
+        return await classifier.ainvoke({"reviews": reviews}, config=run_config())
+
+    embed_many = timed_upstream(metrics, "embeddings", "embed_documents", embeddings.aembed_documents)
+    return {
+        "embed": MicroBatcher("embed", embed_many, BATCH_MAX_SIZE, BATCH_WINDOW_MS),
+        "classify": MicroBatcher("classify", classify_many, BATCH_MAX_SIZE, BATCH_WINDOW_MS),
+    }
+
+
+# Shared clients and pipelines are created once, when the server starts
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.tasks = TaskStore(TASKS_DB_PATH)
+    await app.state.tasks.open()
+    app.state.pipelines = build_clients()
+    if app.state.pipelines["rag"] is not None:
+        await app.state.pipelines["rag"].open([RAG_DEFAULT_COLLECTION])
+    app.state.batchers = build_batchers(app.state.pipelines)
+    for batcher in app.state.batchers.values():
+        batcher.start()
+    loop_monitor = asyncio.create_task(monitor_event_loop(metrics))
+    yield
+    loop_monitor.cancel()
+    for batcher in app.state.batchers.values():
+        await batcher.stop()
+    app.state.pipelines = None
+    await app.state.tasks.close()
+
 
 app = FastAPI(
     title="My First API",
     description="Learning FastAPI step by step",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Cached GET routes (TTL per route, ETag / If-None-Match -> 304)
+response_cache = cache_from_env()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+# Added last so it is outermost and also sees cache hits
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 
 @app.get("/")
 def read_root():
@@ -15,7 +93,43 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "in_flight": metrics.in_flight,
+        "event_loop_lag_ms": round(metrics.loop_lag_s * 1000, 2),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(request: Request):
+    lines = metrics.prometheus_lines() + response_cache.prometheus_lines()
+    lines += batcher_lines(getattr(request.app.state, "batchers", None) or {})
+    return "\n".join(lines) + "\n"
+
+
+# Opt-in sampling profiler (ENABLE_PROFILER=1): samples every thread's stack,
+# including the event loop's, and returns collapsed stacks for a flame graph
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = Query(default=10, gt=0, le=120),
+                  interval_ms: float = Query(default=5, ge=1, le=100)):
+    if not profiler_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        sampler = StackSampler(interval_ms / 1000)
+        stacks = await asyncio.to_thread(sampler.run, seconds)
+    finally:
+        profile_lock.release()
+    folded = StackSampler.collapsed(stacks)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    filename = f"profile-{time.strftime('%Y%m%dT%H%M%S')}.folded"
+    with open(os.path.join(PROFILE_DIR, filename), "w") as f:
+        f.write(folded)
+    return PlainTextResponse(folded, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(sampler.samples),
+    })
 
 
 # @app.get("/hello/{name}")
@@ -71,12 +185,7 @@ def say_hello(name: str):
 # }
 
 # (Temperature can be a hardcoded value, no real API needed)
-
-
-@app.get("/weather")
-def get_weather(city: str = "New York", units: str = "celsius"):
-    temp = 22 if units == "celsius" else 72
-    return {"city": city, "temperature": temp, "units": units}
+# Implemented by get_weather above.
 
 
 
@@ -85,7 +194,256 @@ def add(a: int, b: int):
     return {"result": a + b}
 
 
-@app.post("/tasks/")
-def create_task(title: str, description: str, completed: bool = False):
-    return title, description, completed
+# Tasks
+# Send an Idempotency-Key header to make retries safe: repeating a key
+# returns the task created the first time (200) instead of a duplicate (201).
+# Reusing a key with a different body is rejected with 422.
+
+MAX_BULK = 1000
+
+
+class TaskCreate(BaseModel):
+    title: str = Field(min_length=1, max_length=200)
+    description: str = ""
+    completed: bool = False
+
+
+class TaskUpdate(BaseModel):
+    title: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+class Task(TaskCreate):
+    id: int
+    created_at: float
+    updated_at: float
+
+
+class TaskPage(BaseModel):
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
+
+class BulkCreateRequest(BaseModel):
+    tasks: List[TaskCreate] = Field(min_length=1, max_length=MAX_BULK)
+
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    items: List[Task]
+
+
+class BulkUpdateRequest(BaseModel):
+    tasks: List[TaskBulkUpdate] = Field(min_length=1, max_length=MAX_BULK)
+
+
+class BulkUpdateResponse(BaseModel):
+    updated: int
+    items: List[Task]
+    missing: List[int]
+
+
+@app.post("/tasks/", response_model=Task, status_code=201)
+async def create_task(body: TaskCreate, request: Request, response: Response,
+                      idempotency_key: Optional[str] = Header(default=None)):
+    try:
+        task, created = await request.app.state.tasks.create(body.model_dump(), idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not created:
+        response.status_code = 200
+    return task
+
+
+@app.get("/tasks/", response_model=TaskPage)
+async def list_tasks(request: Request, completed: Optional[bool] = None,
+                     limit: int = Query(default=50, ge=1, le=500), cursor: Optional[str] = None):
+    try:
+        items, next_cursor = await request.app.state.tasks.list(completed, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.post("/tasks/bulk", response_model=BulkCreateResponse, status_code=201)
+async def bulk_create_tasks(body: BulkCreateRequest, request: Request, response: Response,
+                            idempotency_key: Optional[str] = Header(default=None)):
+    # One request key covers the whole batch; each task gets "<key>:<position>" and the hash of the whole body
+    tasks = [t.model_dump() for t in body.tasks]
+    keys = [f"{idempotency_key}:{i}" for i in range(len(tasks))] if idempotency_key else None
+    try:
+        items, created = await request.app.state.tasks.create_many(tasks, keys, request_fingerprint(tasks))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not created:
+        response.status_code = 200
+    return {"created": created, "items": items}
+
+
+@app.patch("/tasks/bulk", response_model=BulkUpdateResponse)
+async def bulk_update_tasks(body: BulkUpdateRequest, request: Request):
+    items = await request.app.state.tasks.update_many([t.model_dump() for t in body.tasks])
+    found = [item for item in items if item is not None]
+    missing = [t.id for t, item in zip(body.tasks, items) if item is None]
+    return {"updated": len(found), "items": found, "missing": missing}
+
+
+@app.get("/tasks/{task_id}", response_model=Task)
+async def get_task(task_id: int, request: Request):
+    task = await request.app.state.tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@app.patch("/tasks/{task_id}", response_model=Task)
+async def update_task(task_id: int, body: TaskUpdate, request: Request):
+    task = await request.app.state.tasks.update(task_id, body.model_dump())
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+# LLM pipelines
+# Each streaming endpoint returns Server-Sent Events:
+#   event: chunk  data: {"field": ..., "delta": ...} or {"field": ..., "value": ...}
+#   event: result data: {...}        (final state)
+#   event: error  data: {"error": ...}
+#   event: done   data: {}
+
+class ReviewRequest(BaseModel):
+    review: str
+
+
+class EmbedRequest(BaseModel):
+    text: str
+
+
+class BlogRequest(BaseModel):
+    domain: str
+
+
+class ReportRequest(BaseModel):
+    topic: str
+
+
+class RagChatRequest(BaseModel):
+    question: str
+    collection: str = RAG_DEFAULT_COLLECTION
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def get_pipeline(request: Request, name: str):
+    pipeline = request.app.state.pipelines.get(name)
+    if pipeline is None:
+        raise HTTPException(status_code=503, detail=f"The {name} pipeline is not configured")
+    return pipeline
+
+
+async def stream_state(pipeline, inputs: dict, stages: dict):
+    """
+    Stream each named stage of a pipeline as it runs, then the final state.
+
+    `stages` maps a stage's run_name to the field it produces. String
+    outputs are streamed token by token; dict outputs are sent per key.
+    """
+    try:
+        async for event in pipeline.astream_events(inputs, config=run_config(), version="v2"):
+            if event["event"] == "on_chain_stream" and event["name"] in stages:
+                chunk = event["data"]["chunk"]
+                if isinstance(chunk, dict):
+                    for field, value in chunk.items():
+                        yield sse("chunk", {"field": field, "value": value})
+                else:
+                    yield sse("chunk", {"field": stages[event["name"]], "delta": chunk})
+            elif event["event"] == "on_chain_end" and not event["parent_ids"]:
+                yield sse("result", event["data"]["output"])
+    except Exception as e:
+        yield sse("error", {"error": str(e)})
+    yield sse("done", {})
+
+
+REVIEW_STAGES = {"fields": "fields", "auto_reply": "auto_reply"}
+BLOG_STAGES = {"topic": "topic", "title": "title", "summary": "summary"}
+REPORT_STAGES = {"report_chain": "report", "summary_chain": "summary"}
+
+
+@app.post("/reviews/analyze")
+async def analyze_review(body: ReviewRequest, request: Request):
+    return await get_pipeline(request, "review").ainvoke({"review": body.review}, config=run_config())
+
+
+@app.post("/reviews/analyze/stream")
+async def analyze_review_stream(body: ReviewRequest, request: Request):
+    return sse_response(stream_state(get_pipeline(request, "review"), {"review": body.review}, REVIEW_STAGES))
+
+
+@app.post("/reviews/classify")
+async def classify_review(body: ReviewRequest, request: Request):
+    sentiment = await request.app.state.batchers["classify"].submit(body.review)
+    return {"sentiment": sentiment}
+
+
+@app.post("/embed")
+async def embed(body: EmbedRequest, request: Request):
+    vector = await request.app.state.batchers["embed"].submit(body.text)
+    return {"embedding": vector, "dimensions": len(vector)}
+
+
+@app.get("/batching/stats")
+async def batching_stats(request: Request):
+    return {name: batcher.stats() for name, batcher in request.app.state.batchers.items()}
+
+
+@app.post("/blog")
+async def generate_blog(body: BlogRequest, request: Request):
+    return await get_pipeline(request, "blog").ainvoke({"domain": body.domain}, config=run_config())
+
+
+@app.post("/blog/stream")
+async def generate_blog_stream(body: BlogRequest, request: Request):
+    return sse_response(stream_state(get_pipeline(request, "blog"), {"domain": body.domain}, BLOG_STAGES))
+
+
+@app.post("/report")
+async def generate_report(body: ReportRequest, request: Request):
+    return await get_pipeline(request, "report").ainvoke({"topic": body.topic}, config=run_config())
+
+
+@app.post("/report/stream")
+async def generate_report_stream(body: ReportRequest, request: Request):
+    return sse_response(stream_state(get_pipeline(request, "report"), {"topic": body.topic}, REPORT_STAGES))
+
+
+@app.post("/rag/chat/stream")
+async def rag_chat_stream(body: RagChatRequest, request: Request):
+    rag = get_pipeline(request, "rag")
+
+    async def events():
+        answer, source = "", None
+        try:
+            async for source, delta in rag.astream(body.question, body.collection, config=run_config()):
+                answer += delta
+                yield sse("chunk", {"field": "answer", "source": source, "delta": delta})
+            yield sse("result", {"question": body.question, "answer": answer, "source": source})
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+        yield sse("done", {})
 
+    return sse_response(events())
@@ -0,0 +1,114 @@
+"""
+Micro-batching for endpoints that make many small upstream calls.
+
+Requests submitted within `window_ms` of each other (up to
+`max_batch_size`) are sent upstream as one batched call, and each
+result is handed back to the request that asked for it. Batch sizes and
+queueing delay are recorded for the stats endpoint.
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+
+class MicroBatcher:
+    """Collects single items into batches for an async `handler(items) -> results`."""
+
+    def __init__(self, name: str, handler, max_batch_size: int = 16, window_ms: float = 5.0,
+                 max_in_flight: int = 4):
+        self.name = name
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.window_s = window_ms / 1000.0
+        self._queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._collector = None
+        self._dispatches = set()
+        self.histogram = Counter()
+        self._items = 0
+        self._errors = 0
+        self._wait_s_total = 0.0
+
+    def start(self) -> None:
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        """Stop collecting, let running batches finish and fail anything still queued."""
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+        await asyncio.gather(*self._dispatches, return_exceptions=True)
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+
+    async def submit(self, item):
+        """Queue one item and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._in_flight.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch) -> None:
+        try:
+            # Requests whose client went away are dropped before the upstream call
+            live = [entry for entry in batch if not entry[1].done()]
+            if not live:
+                return
+            now = time.perf_counter()
+            self.histogram[len(live)] += 1
+            self._items += len(live)
+            self._wait_s_total += sum(now - queued_at for _, _, queued_at in live)
+            try:
+                results = await self.handler([item for item, _, _ in live])
+            except Exception as e:
+                self._errors += len(live)
+                for _, future, _ in live:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future, _), result in zip(live, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    self._errors += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._in_flight.release()
+
+    def stats(self) -> dict:
+        batches = sum(self.histogram.values())
+        return {
+            "batches": batches,
+            "items": self._items,
+            "errors": self._errors,
+            "avg_batch_size": self._items / batches if batches else 0.0,
+            "avg_queue_wait_ms": 1000 * self._wait_s_total / self._items if self._items else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.histogram.items())},
+            "queue_depth": self._queue.qsize(),
+            "window_ms": self.window_s * 1000,
+            "max_batch_size": self.max_batch_size,
+        }
@@ -0,0 +1,298 @@
+"""
+Prometheus-style metrics and an opt-in sampling profiler.
+
+- MetricsMiddleware counts requests, times them per route (until the last
+  body chunk, so streaming responses are measured in full) and tracks
+  requests in flight.
+- UpstreamLatencyCallback times LLM and tool calls made by the pipelines;
+  `timed_upstream` does the same for plain async calls (embeddings).
+- `monitor_event_loop` measures how late the event loop wakes up, which
+  is how a blocked loop shows up.
+- StackSampler samples every thread's stack (py-spy style, in-process)
+  and writes collapsed stacks that flamegraph.pl or speedscope render as
+  a flame graph.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from langchain_core.callbacks import BaseCallbackHandler
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_labels(labels: tuple) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label tuples."""
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.setdefault(labels, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def lines(self) -> list:
+        out = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: dict(s, counts=list(s["counts"])) for labels, s in self._series.items()}
+        for labels, s in sorted(series.items()):
+            prefix = format_labels(labels)
+            sep = "," if prefix else ""
+            for bound, count in zip(self.buckets, s["counts"]):
+                out.append(f'{self.name}_bucket{{{prefix}{sep}le="{bound}"}} {count}')
+            out.append(f'{self.name}_bucket{{{prefix}{sep}le="+Inf"}} {s["count"]}')
+            out.append(f"{self.name}_sum{{{prefix}}} {s['sum']:.6f}")
+            out.append(f"{self.name}_count{{{prefix}}} {s['count']}")
+        return out
+
+
+class Metrics:
+    """All metrics the service exports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.upstream_errors = Counter()
+        self.in_flight = 0
+        self.loop_lag_s = 0.0
+        self.loop_lag_max_s = 0.0
+        self.request_duration = Histogram("http_request_duration_seconds", "Request latency by route")
+        self.upstream_duration = Histogram("upstream_request_duration_seconds", "LLM, tool and embedding call latency")
+        self.loop_lag = Histogram("event_loop_lag_seconds", "How late the event loop woke up",
+                                  buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+    def track_in_flight(self, delta: int) -> None:
+        with self._lock:
+            self.in_flight += delta
+
+    def record_request(self, method: str, route: str, status: int, duration_s: float) -> None:
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+        self.request_duration.observe((("method", method), ("route", route)), duration_s)
+
+    def record_upstream(self, upstream: str, name: str, duration_s: float, error: bool = False) -> None:
+        self.upstream_duration.observe((("upstream", upstream), ("name", name)), duration_s)
+        if error:
+            with self._lock:
+                self.upstream_errors[(upstream, name)] += 1
+
+    def record_loop_lag(self, lag_s: float) -> None:
+        with self._lock:
+            self.loop_lag_s = lag_s
+            self.loop_lag_max_s = max(self.loop_lag_max_s, lag_s)
+        self.loop_lag.observe((), lag_s)
+
+    def prometheus_lines(self) -> list:
+        with self._lock:
+            requests = dict(self.requests)
+            upstream_errors = dict(self.upstream_errors)
+            in_flight, lag, lag_max = self.in_flight, self.loop_lag_s, self.loop_lag_max_s
+        lines = ["# HELP http_requests_total Requests by method, route and status",
+                 "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+        lines += ["# HELP http_requests_in_flight Requests currently being served",
+                  "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {in_flight}"]
+        lines += self.request_duration.lines()
+        lines += self.upstream_duration.lines()
+        lines += ["# HELP upstream_errors_total Failed LLM, tool and embedding calls",
+                  "# TYPE upstream_errors_total counter"]
+        for (upstream, name), count in sorted(upstream_errors.items()):
+            lines.append(f'upstream_errors_total{{upstream="{upstream}",name="{name}"}} {count}')
+        lines += ["# HELP event_loop_lag_seconds_last Most recent event loop lag",
+                  "# TYPE event_loop_lag_seconds_last gauge",
+                  f"event_loop_lag_seconds_last {lag:.6f}",
+                  "# HELP event_loop_lag_seconds_max Worst event loop lag since start",
+                  "# TYPE event_loop_lag_seconds_max gauge",
+                  f"event_loop_lag_seconds_max {lag_max:.6f}"]
+        lines += self.loop_lag.lines()
+        return lines
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording count, latency and in-flight requests per route template."""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    @staticmethod
+    def route_template(scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Responses served before routing (e.g. cache hits) are matched here
+        app = scope.get("app")
+        for candidate in getattr(getattr(app, "router", None), "routes", []):
+            if candidate.matches(scope)[0] == Match.FULL:
+                return candidate.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+        self.metrics.track_in_flight(1)
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            self.metrics.track_in_flight(-1)
+            # Route templates, not raw paths, keep label cardinality bounded
+            self.metrics.record_request(scope["method"], self.route_template(scope), status,
+                                        time.perf_counter() - started)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
+
+
+class UpstreamLatencyCallback(BaseCallbackHandler):
+    """Times every LLM and tool call made with this handler in the run config."""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        self._started = {}
+
+    def _start(self, run_id, upstream: str, name: str) -> None:
+        self._started[run_id] = (upstream, name, time.perf_counter())
+
+    def _end(self, run_id, error: bool = False) -> None:
+        started = self._started.pop(run_id, None)
+        if started:
+            upstream, name, t0 = started
+            self.metrics.record_upstream(upstream, name, time.perf_counter() - t0, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._start(run_id, "llm", str(params.get("model") or params.get("_type") or "chat").split("/")[-1])
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._start(run_id, "llm", str(params.get("model") or params.get("_type") or "llm").split("/")[-1])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool", kwargs.get("name") or (serialized or {}).get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+
+def timed_upstream(metrics: Metrics, upstream: str, name: str, fn):
+    """Wrap an async function so each call is recorded as an upstream call."""
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            metrics.record_upstream(upstream, name, time.perf_counter() - started, error=True)
+            raise
+        metrics.record_upstream(upstream, name, time.perf_counter() - started)
+        return result
+    return wrapper
+
+
+async def monitor_event_loop(metrics: Metrics, interval_s: float = 0.25) -> None:
+    """Record how much later than requested the loop resumes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        metrics.record_loop_lag(max(0.0, loop.time() - expected))
+
+
+class StackSampler:
+    """Samples all thread stacks at a fixed interval and aggregates them as collapsed stacks."""
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.samples = 0
+
+    def run(self, seconds: float) -> Counter:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                parts.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+            time.sleep(self.interval_s)
+        return stacks
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        """Brendan Gregg's folded format: 'frame;frame;frame count' per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def batcher_lines(batchers: dict) -> list:
+    """Micro-batch sizes and queue depth in Prometheus text format."""
+    lines = ["# HELP micro_batch_batches_total Upstream batches sent, by batcher and batch size",
+             "# TYPE micro_batch_batches_total counter"]
+    depth = ["# HELP micro_batch_queue_depth Items waiting to be batched",
+             "# TYPE micro_batch_queue_depth gauge"]
+    for name, batcher in batchers.items():
+        stats = batcher.stats()
+        for size, count in stats["batch_size_histogram"].items():
+            lines.append(f'micro_batch_batches_total{{batcher="{name}",size="{size}"}} {count}')
+        depth.append(f'micro_batch_queue_depth{{batcher="{name}"}} {stats["queue_depth"]}')
+    return lines + depth
+
+
+def profiler_enabled() -> bool:
+    return os.environ.get("ENABLE_PROFILER", "").lower() in ("1", "true", "yes")
+
+
+# Only one profile at a time; sampling is cheap but not free
+profile_lock = threading.Lock()
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
@@ -0,0 +1,359 @@
+"""
+LLM pipelines served by the FastAPI app.
+
+These are the same chains the Streamlit apps run (day004 review analyzer,
+day003 blog pipeline, day01 report generator, day012 RAG chat), built
+once from shared clients so every request reuses the same model client
+and HTTP connection pool.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+from urllib.parse import quote_plus
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableBranch, RunnableLambda, RunnableParallel, RunnablePassthrough
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model, get_embeddings
+from utils.rate_limiter import get_rate_limiter, RateLimitedEmbeddings
+
+NEED_WEB_SEARCH = "[NEED_WEB_SEARCH]"
+
+
+# Review analyzer (day004)
+OUTPUT_CONTRACT_TEXT = """{
+  "sentiment": "Positive|Negative|Mixed|Neutral",
+  "reason": "string",
+  "pros": ["string"],
+  "cons": ["string"],
+  "rating": { "stars": 1, "out_of": 5, "why": "string" },
+  "summary_bullets": ["string", "string", "string", "string"],
+  "auto_reply": "string"
+}"""
+
+EXTRACTOR_TEMPLATE = """You are a precise information extractor.
+- Obey this OUTPUT_CONTRACT strictly:
+{schema}
+- Be terse. No extra words or headings unless asked.
+
+"""
+
+REVIEW_TASKS = {
+    "sentiment": "Task: Return the overall sentiment for the REVIEW as one of: Positive, Negative, Mixed, or Neutral.\n"
+                 "Output: ONE WORD ONLY (no punctuation).",
+    "reason": "Task: Give a one-line reason for the sentiment (what tipped the balance).\n"
+              "Output: One short sentence, no lists.",
+    "pros_raw": "Task: Extract clear Pros from the REVIEW.\nOutput: JSON array of short phrases only.",
+    "cons_raw": "Task: Extract clear Cons from the REVIEW.\nOutput: JSON array of short phrases only.",
+    "rating_raw": "Task: Infer a star rating (1–5) and a brief justification.\nOutput: JSON object exactly like:\n"
+                  '{{"stars": <int 1-5>, "out_of": 5, "why": "<short reason>"}}\n'
+                  "Rules: Output JSON only. No code fences/backticks.",
+    "summary_raw": "Task: Produce 3–4 bullet summary points.\n"
+                   "Output: JSON array of 3 or 4 short strings (bullets).",
+}
+
+REPLY_TEMPLATES = {
+    "positive": "Write a brief warm thank-you replying to a positive review.",
+    "negative": "Write a brief empathetic apology and ask for details to fix issues.",
+    "mixed": "Write a brief balanced reply: thank for positives, apologise for issues, ask for 1–2 specifics.",
+    "neutral": "Write a brief neutral professional acknowledgment.",
+}
+
+
+def coerce_json(s: str):
+    """Accepts strings with code fences or extra prose; returns parsed JSON obj/array."""
+    txt = re.sub(r"^```(?:json)?\s*|\s*```$", "", s.strip(), flags=re.I | re.M)
+    m = re.search(r"(\{.*?\}|\[.*?\])", txt, flags=re.S)
+    if not m:
+        raise ValueError(f"No JSON object/array found in: {s[:80]}...")
+    return json.loads(m.group(1))
+
+
+def build_review_analyzer(llm):
+    """Fan-out extraction, assembly and a sentiment-routed auto reply."""
+    parser = StrOutputParser()
+    fanout = RunnableParallel({
+        key: PromptTemplate.from_template(EXTRACTOR_TEMPLATE + task + "\nREVIEW: {review}\n").partial(
+            schema=OUTPUT_CONTRACT_TEXT) | llm | parser
+        for key, task in REVIEW_TASKS.items()
+    })
+
+    def assemble(d):
+        return {
+            "sentiment": d["sentiment"].strip(),
+            "reason": d["reason"].strip(),
+            "pros": coerce_json(d["pros_raw"]),
+            "cons": coerce_json(d["cons_raw"]),
+            "rating": coerce_json(d["rating_raw"]),
+            "summary_bullets": coerce_json(d["summary_raw"]),
+        }
+
+    replies = {
+        name: PromptTemplate.from_template("You are a polite brand rep.\nREVIEW: {review}\n" + instruction)
+        | llm | parser
+        for name, instruction in REPLY_TEMPLATES.items()
+    }
+    reply_branch = RunnableBranch(
+        *[(lambda x, name=name: name in x["sentiment"].lower(), replies[name]) for name in REPLY_TEMPLATES],
+        replies["neutral"],
+    )
+
+    # {"review"} -> +fields -> +auto_reply
+    return (
+        RunnablePassthrough.assign(fields=(fanout | RunnableLambda(assemble)).with_config(run_name="fields"))
+        | RunnableLambda(lambda d: {"review": d["review"], **d["fields"]})
+        | RunnablePassthrough.assign(auto_reply=reply_branch.with_config(run_name="auto_reply"))
+    )
+
+
+BATCH_SENTIMENT_TEMPLATE = """Task: Return the overall sentiment of each review in REVIEWS as one of: Positive, Negative, Mixed, or Neutral.
+Output: JSON array of exactly {count} labels, one per review, in the same order. No other text.
+REVIEWS (JSON array): {reviews}
+"""
+
+
+def build_sentiment_classifier(llm):
+    """{"review"} -> "Positive" | "Negative" | "Mixed" | "Neutral" (the analyzer's sentiment step alone)"""
+    prompt = PromptTemplate.from_template(
+        EXTRACTOR_TEMPLATE + REVIEW_TASKS["sentiment"] + "\nREVIEW: {review}\n"
+    ).partial(schema=OUTPUT_CONTRACT_TEXT)
+    return prompt | llm | StrOutputParser() | RunnableLambda(lambda s: s.strip())
+
+
+def build_batch_sentiment_classifier(llm):
+    """{"reviews"} -> one sentiment label per review, from a single model call for the whole list"""
+    batch_chain = PromptTemplate.from_template(BATCH_SENTIMENT_TEMPLATE) | llm | StrOutputParser()
+    single = build_sentiment_classifier(llm)
+
+    async def classify(inputs, config):
+        reviews = inputs["reviews"]
+        raw = await batch_chain.ainvoke(
+            {"count": len(reviews), "reviews": json.dumps(reviews, ensure_ascii=False)}, config
+        )
+        try:
+            labels = coerce_json(raw)
+        except ValueError:
+            labels = None
+        if isinstance(labels, list) and len(labels) == len(reviews):
+            return [str(label).strip() for label in labels]
+        # The model dropped or merged entries; classify one by one rather than misalign the results
+        return await single.abatch([{"review": r} for r in reviews], config)
+
+    return RunnableLambda(classify)
+
+
+# Blog pipeline (day003)
+def build_blog_pipeline(llm):
+    """{"domain"} -> +topic -> +title -> +summary (stages are named after the field they add)"""
+    topic_chain = PromptTemplate.from_template(
+        "Given the broad domain: {domain}\n"
+        "Propose one specific, fresh **niche blog topic** (max 12 words). Return only the topic text."
+    ) | llm | StrOutputParser()
+    title_chain = PromptTemplate.from_template(
+        "Given this blog topic: {topic}\n"
+        "Write a catchy blog **title** (≤ 12 words). Return only the title."
+    ) | llm | StrOutputParser()
+    summary_chain = PromptTemplate.from_template(
+        "Based on this blog title: {title}\n"
+        "Write a single-paragraph blog summary (4–6 sentences). Return only the paragraph."
+    ) | llm | StrOutputParser()
+    return (
+        RunnablePassthrough.assign(topic=topic_chain.with_config(run_name="topic"))
+        | RunnablePassthrough.assign(title=title_chain.with_config(run_name="title"))
+        | RunnablePassthrough.assign(summary=summary_chain.with_config(run_name="summary"))
+    )
+
+
+# Report generator (day01)
+REPORT_TEMPLATE = """You are a public-health analyst.
+Write a detailed, well-structured **markdown report** on the topic: "{topic}".
+
+Requirements:
+- Audience: intelligent non-experts (10th–12th grade clarity)
+- Sections (use H2/H3): Introduction, Prevalence & Trends, Key Drivers, Health & Economic Impact, Policy & City-Level Interventions, Case Snapshots, Data Gaps, Conclusion
+- Include India-urban context (income strata, food environment, sedentary work, women & children, metros vs tier-2)
+- Be balanced, evidence-informed (no citations needed), ~800–1000 words
+- End with a short "Key Terms" glossary
+
+Return only markdown text."""
+
+SUMMARY_TEMPLATE = """You are a senior editor.
+Summarize the following report into exactly **5 numbered points (1–5)** in markdown.
+Each point should be one crisp sentence focusing on the most decision-relevant insights.
+
+Report:
+========
+{report}
+========
+
+Return only the 5 numbered lines."""
+
+
+def build_report_generator(llm):
+    """{"topic"} -> +report -> +summary"""
+    report_chain = (PromptTemplate.from_template(REPORT_TEMPLATE) | llm | StrOutputParser()).with_config(
+        run_name="report_chain")
+    summary_chain = (PromptTemplate.from_template(SUMMARY_TEMPLATE) | llm | StrOutputParser()).with_config(
+        run_name="summary_chain")
+    return RunnablePassthrough.assign(report=report_chain) | RunnablePassthrough.assign(summary=summary_chain)
+
+
+# RAG chat (day012)
+ANSWER_TEMPLATE = """
+You are a helpful assistant. Answer using ONLY the context below:
+
+Content:
+{context}
+
+Question:
+{question}
+
+If the context is enough, answer accurately.
+If not, respond only and exactly with this tag: [NEED_WEB_SEARCH], do not
+provide any extra stuff just return the tag if the context is not enough
+for answering the question.
+"""
+
+WEB_TEMPLATE = """
+User Question: {question}
+
+Web search results:
+{web_results}
+
+Based on the web results, provide a complete and helpful answer to the question asked by the user.
+Provide citations as well, if available.
+"""
+
+
+def pg_connection_string_from_env():
+    """Build the PGVector connection string from the same PG_* settings day012 uses."""
+    if os.environ.get("PG_CONNECTION_STRING"):
+        return os.environ["PG_CONNECTION_STRING"]
+    if not os.environ.get("PG_HOST"):
+        return None
+    return (
+        f"postgresql+psycopg://{os.environ.get('PG_USER', 'neondb_owner')}:"
+        f"{quote_plus(os.environ.get('PG_PASSWORD', ''))}@{os.environ['PG_HOST']}:"
+        f"{os.environ.get('PG_PORT', '5432')}/{os.environ.get('PG_DATABASE', 'neondb')}?sslmode=require"
+    )
+
+
+class RagChat:
+    """
+    Retrieval answer with a web-search fallback; one vector store per collection.
+
+    Stores run in PGVector's async mode so retrieval never blocks the event
+    loop. Their table setup runs once, in `open` (called from the lifespan
+    for the default collection) or on first use of another collection.
+    """
+
+    def __init__(self, llm, embeddings, connection_string, search_tool=None):
+        self.llm = llm
+        self.embeddings = embeddings
+        self.connection_string = connection_string
+        self.search_tool = search_tool
+        self._stores = {}
+        self._stores_lock = asyncio.Lock()
+        self.answer_prompt = PromptTemplate.from_template(ANSWER_TEMPLATE)
+        self.web_chain = PromptTemplate.from_template(WEB_TEMPLATE) | llm | StrOutputParser()
+
+    async def store(self, collection: str):
+        async with self._stores_lock:
+            if collection not in self._stores:
+                from langchain_postgres import PGVector
+
+                store = PGVector(
+                    embeddings=self.embeddings,
+                    collection_name=collection,
+                    connection=self.connection_string,
+                    async_mode=True,
+                )
+                await store.__apost_init__()
+                self._stores[collection] = store
+            return self._stores[collection]
+
+    async def open(self, collections) -> None:
+        """Set up the vector stores for `collections` ahead of the first request."""
+        for collection in collections:
+            await self.store(collection)
+
+    def answer_chain(self, store):
+        return (
+            {
+                "context": store.as_retriever(search_kwargs={"k": 3})
+                | (lambda chunks: "\n\n".join(c.page_content for c in chunks)),
+                "question": RunnablePassthrough(),
+            }
+            | self.answer_prompt
+            | self.llm
+            | StrOutputParser()
+        )
+
+    async def web_results(self, question: str, config: dict = None) -> str:
+        if self.search_tool is None:
+            return "Web search is not configured."
+        return str(await self.search_tool.ainvoke({"query": question}, config=config))
+
+    async def astream(self, question: str, collection: str, config: dict = None):
+        """
+        Stream (source, chunk) pairs.
+
+        The document answer is streamed directly unless it starts with the
+        NEED_WEB_SEARCH tag, in which case the web-search answer is streamed
+        instead.
+        """
+        chunks = self.answer_chain(await self.store(collection)).astream(question, config=config)
+        head = ""
+        async for chunk in chunks:
+            head += chunk
+            if len(head.lstrip()) >= len(NEED_WEB_SEARCH) or not NEED_WEB_SEARCH.startswith(head.lstrip()):
+                break
+        if not head.lstrip().startswith(NEED_WEB_SEARCH):
+            yield "documents", head
+            async for chunk in chunks:
+                yield "documents", chunk
+            return
+        await chunks.aclose()
+        web_results = await self.web_results(question, config)
+        async for chunk in self.web_chain.astream({"question": question, "web_results": web_results}, config=config):
+            yield "web", chunk
+
+
+def build_clients():
+    """
+    Create the shared clients and pipelines once per process.
+
+    Returns:
+        Dict with the llm, embeddings, the batch sentiment classifier and the
+        review, blog, report and rag pipelines
+    """
+    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    limiter = get_rate_limiter("gemini", api_key)
+    llm = get_chat_model("gemini-2.5-flash", temperature=0.2, api_key=api_key,
+                         rate_limiter=limiter.for_langchain("interactive"))
+
+    search_tool = None
+    if os.environ.get("TAVILY_API_KEY"):
+        from langchain_tavily import TavilySearch
+
+        search_tool = TavilySearch(max_results=3, topic="general", tavily_api_key=os.environ["TAVILY_API_KEY"])
+
+    embeddings = RateLimitedEmbeddings(get_embeddings("models/gemini-embedding-001", api_key=api_key), limiter)
+    connection_string = pg_connection_string_from_env()
+    rag = RagChat(llm, embeddings, connection_string, search_tool) if connection_string else None
+
+    return {
+        "llm": llm,
+        "embeddings": embeddings,
+        "classify": build_batch_sentiment_classifier(llm),
+        "review": build_review_analyzer(llm),
+        "blog": build_blog_pipeline(llm),
+        "report": build_report_generator(llm),
+        "rag": rag,
+    }
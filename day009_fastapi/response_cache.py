@@ -0,0 +1,158 @@
+"""
+Response caching with ETags for the deterministic GET routes.
+
+Responses of configured routes are cached per (path, sorted query
+params) for the route's TTL. Every cached response carries an ETag, and
+a request whose If-None-Match matches it gets an empty 304. Storage is
+an in-process LRU by default or any Redis-compatible client (shared
+between workers) via RESPONSE_CACHE_REDIS_URL, using the same backends
+as the LLM response cache.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from starlette.routing import compile_path
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_cache import make_backend
+
+# Route template -> TTL in seconds
+DEFAULT_ROUTE_TTLS = {
+    "/weather": 600,
+    "/cities/{city_name}/restaurants": 300,
+    "/hello/{name}": 3600,
+}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """Route matching, storage and hit/miss counters for the middleware."""
+
+    def __init__(self, route_ttls: dict = None, backend=None, max_entries: int = 1000):
+        self.routes = [(compile_path(template)[0], template, ttl)
+                       for template, ttl in (route_ttls or DEFAULT_ROUTE_TTLS).items()]
+        self.backend = backend or make_backend("memory", max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._counts = {template: {"hit": 0, "miss": 0, "not_modified": 0} for _, template, _ in self.routes}
+
+    def match(self, path: str):
+        """(route template, ttl) for a cacheable path, or (None, None)."""
+        for regex, template, ttl in self.routes:
+            if regex.match(path):
+                return template, ttl
+        return None, None
+
+    @staticmethod
+    def key(path: str, query: str) -> str:
+        normalised = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+        return "http:" + hashlib.sha256(f"{path}?{normalised}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        raw = self.backend.get(key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry if entry["expires_at"] > time.time() else None
+
+    def set(self, key: str, entry: dict) -> None:
+        self.backend.set(key, json.dumps(entry))
+
+    def count(self, template: str, result: str) -> None:
+        with self._lock:
+            self._counts[template][result] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {template: dict(c) for template, c in self._counts.items()}
+        for c in counts.values():
+            served = c["hit"] + c["not_modified"]
+            total = served + c["miss"]
+            c["hit_ratio"] = served / total if total else 0.0
+        return counts
+
+    def prometheus_lines(self) -> list:
+        """Counters and hit ratio per route in Prometheus text format."""
+        stats = self.stats()
+        lines = ["# HELP http_cache_requests_total Cacheable GET requests by route and result",
+                 "# TYPE http_cache_requests_total counter"]
+        for template, c in stats.items():
+            for result in ("hit", "miss", "not_modified"):
+                lines.append(f'http_cache_requests_total{{route="{template}",result="{result}"}} {c[result]}')
+        lines += ["# HELP http_cache_hit_ratio Share of cacheable GET requests served from cache (incl. 304)",
+                  "# TYPE http_cache_hit_ratio gauge"]
+        for template, c in stats.items():
+            lines.append(f'http_cache_hit_ratio{{route="{template}"}} {c["hit_ratio"]:.4f}')
+        return lines
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Serves configured GET routes from a ResponseCache, with ETag / 304 support."""
+
+    def __init__(self, app, cache: ResponseCache):
+        super().__init__(app)
+        self.cache = cache
+
+    async def dispatch(self, request, call_next):
+        if request.method != "GET":
+            return await call_next(request)
+        template, ttl = self.cache.match(request.url.path)
+        if template is None:
+            return await call_next(request)
+
+        key = self.cache.key(request.url.path, request.url.query)
+        if_none_match = request.headers.get("if-none-match")
+        entry = self.cache.get(key)
+        if entry is not None:
+            age = int(time.time() - entry["stored_at"])
+            headers = {"ETag": entry["etag"], "Cache-Control": f"max-age={ttl}", "Age": str(age), "X-Cache": "HIT"}
+            if etag_matches(if_none_match, entry["etag"]):
+                self.cache.count(template, "not_modified")
+                return Response(status_code=304, headers=headers)
+            self.cache.count(template, "hit")
+            return Response(content=entry["body"], status_code=entry["status"],
+                            media_type=entry["media_type"], headers=headers)
+
+        self.cache.count(template, "miss")
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        now = time.time()
+        self.cache.set(key, {
+            "body": body.decode("utf-8"),
+            "status": response.status_code,
+            "media_type": response.headers.get("content-type"),
+            "etag": etag,
+            "stored_at": now,
+            "expires_at": now + ttl,
+        })
+        headers = {"ETag": etag, "Cache-Control": f"max-age={ttl}", "X-Cache": "MISS"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, status_code=response.status_code,
+                        media_type=response.headers.get("content-type"), headers=headers)
+
+
+def cache_from_env() -> ResponseCache:
+    """Memory LRU by default; RESPONSE_CACHE_REDIS_URL switches to a shared Redis backend."""
+    redis_url = os.environ.get("RESPONSE_CACHE_REDIS_URL")
+    backend = None
+    if redis_url:
+        backend = make_backend("redis", url=redis_url, ttl_seconds=max(DEFAULT_ROUTE_TTLS.values()))
+    return ResponseCache(backend=backend, max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1000")))
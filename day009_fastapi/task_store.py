@@ -0,0 +1,238 @@
+"""
+SQLite-backed task store for the /tasks endpoints.
+
+Uses aiosqlite so database work never blocks the event loop. Writes are
+idempotent when the caller supplies an idempotency key (reusing a key
+with a different body raises IdempotencyConflict), listing is served
+from a (completed, id) index with keyset (cursor) pagination, and bulk
+create/update run as one transaction each so thousands of tasks per
+minute cost a handful of commits.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import time
+
+import aiosqlite
+
+DEFAULT_DB_PATH = "tasks.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    request_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed_id ON tasks (completed, id);
+"""
+
+COLUMNS = "id, title, description, completed, created_at, updated_at"
+UPDATABLE = ("title", "description", "completed")
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with a different request body."""
+
+
+def request_fingerprint(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def row_to_task(row) -> dict:
+    return {
+        "id": row[0],
+        "title": row[1],
+        "description": row[2],
+        "completed": bool(row[3]),
+        "created_at": row[4],
+        "updated_at": row[5],
+    }
+
+
+class TaskStore:
+    """Async task repository on a single WAL-mode SQLite connection."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._db = None
+        # One connection is shared by all requests; writes take turns so one
+        # request's commit or rollback never covers another's statements
+        self._write_lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+        async with self._db.execute("PRAGMA table_info(tasks)") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if "request_hash" not in columns:
+            # Rows written before the column existed replay without a body check
+            await self._db.execute("ALTER TABLE tasks ADD COLUMN request_hash TEXT")
+        await self._db.commit()
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _fetch_by_keys(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        async with self._db.execute(
+            f"SELECT {COLUMNS}, idempotency_key, request_hash FROM tasks WHERE idempotency_key IN ({placeholders})",
+            keys,
+        ) as cursor:
+            return {row[6]: (row_to_task(row), row[7]) for row in await cursor.fetchall()}
+
+    async def create(self, task: dict, idempotency_key: str = None):
+        """
+        Create one task.
+
+        Args:
+            task: title, description and completed
+            idempotency_key: Repeating a key returns the task created the first time
+
+        Returns:
+            (task, created) where created is False for an idempotent replay
+
+        Raises:
+            IdempotencyConflict: The key was first used with a different task
+        """
+        tasks, created = await self.create_many([task], [idempotency_key])
+        return tasks[0], bool(created)
+
+    async def create_many(self, tasks: list, idempotency_keys: list = None, fingerprint: str = None):
+        """
+        Create tasks in one transaction.
+
+        Args:
+            tasks: Task dicts
+            idempotency_keys: Optional key per task (None entries are not deduplicated)
+            fingerprint: Request hash stored with every keyed task (defaults to a hash of each task)
+
+        Returns:
+            (tasks in input order, number of newly created tasks)
+
+        Raises:
+            IdempotencyConflict: A key was first used with a different request; nothing is written
+        """
+        keys = idempotency_keys or [None] * len(tasks)
+        hashes = [(fingerprint or request_fingerprint(task)) if key is not None else None
+                  for task, key in zip(tasks, keys)]
+        now = time.time()
+        results, replayed = [None] * len(tasks), {}
+        async with self._write_lock:
+            try:
+                await self._insert(tasks, keys, hashes, now, results, replayed)
+                if replayed:
+                    existing = await self._fetch_by_keys(list(replayed))
+                    for key, indices in replayed.items():
+                        task, stored_hash = existing[key]
+                        for i in indices:
+                            if stored_hash is not None and stored_hash != hashes[i]:
+                                raise IdempotencyConflict(f"Idempotency key {key!r} was used with a different request")
+                            results[i] = task
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                raise
+        created = len(tasks) - sum(len(indices) for indices in replayed.values())
+        return results, created
+
+    async def _insert(self, tasks, keys, hashes, now, results, replayed) -> None:
+        for i, (task, key, request_hash) in enumerate(zip(tasks, keys, hashes)):
+            cursor = await self._db.execute(
+                "INSERT INTO tasks (title, description, completed, created_at, updated_at, idempotency_key, "
+                "request_hash) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(idempotency_key) DO NOTHING",
+                (task["title"], task.get("description", ""), int(task.get("completed", False)), now, now, key,
+                 request_hash),
+            )
+            if cursor.rowcount:
+                results[i] = {"id": cursor.lastrowid, "title": task["title"],
+                              "description": task.get("description", ""),
+                              "completed": bool(task.get("completed", False)),
+                              "created_at": now, "updated_at": now}
+            else:
+                replayed.setdefault(key, []).append(i)
+
+    async def get(self, task_id: int):
+        async with self._db.execute(f"SELECT {COLUMNS} FROM tasks WHERE id = ?", (task_id,)) as cursor:
+            row = await cursor.fetchone()
+        return row_to_task(row) if row else None
+
+    async def update_many(self, updates: list):
+        """
+        Apply partial updates in one transaction.
+
+        Args:
+            updates: Dicts with "id" plus any of title, description, completed
+
+        Returns:
+            Updated tasks in input order (None for ids that do not exist)
+        """
+        now = time.time()
+        async with self._write_lock:
+            try:
+                for update in updates:
+                    fields = {k: update[k] for k in UPDATABLE if update.get(k) is not None}
+                    if "completed" in fields:
+                        fields["completed"] = int(fields["completed"])
+                    assignments = "".join(f"{k} = ?, " for k in fields)
+                    await self._db.execute(
+                        f"UPDATE tasks SET {assignments}updated_at = ? WHERE id = ?",
+                        (*fields.values(), now, update["id"]),
+                    )
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                raise
+        ids = [u["id"] for u in updates]
+        placeholders = ",".join("?" * len(ids))
+        async with self._db.execute(f"SELECT {COLUMNS} FROM tasks WHERE id IN ({placeholders})", ids) as cursor:
+            found = {row[0]: row_to_task(row) for row in await cursor.fetchall()}
+        return [found.get(task_id) for task_id in ids]
+
+    async def update(self, task_id: int, fields: dict):
+        return (await self.update_many([dict(fields, id=task_id)]))[0]
+
+    async def list(self, completed: bool = None, limit: int = 50, cursor: str = None):
+        """
+        One page of tasks ordered by id.
+
+        Args:
+            completed: Filter by completion status (None for all)
+            limit: Page size
+            cursor: next_cursor from the previous page
+
+        Returns:
+            (tasks, next_cursor or None on the last page)
+        """
+        after = decode_cursor(cursor) if cursor else 0
+        if completed is None:
+            sql, params = f"SELECT {COLUMNS} FROM tasks WHERE id > ? ORDER BY id LIMIT ?", (after, limit + 1)
+        else:
+            sql = f"SELECT {COLUMNS} FROM tasks WHERE completed = ? AND id > ? ORDER BY id LIMIT ?"
+            params = (int(completed), after, limit + 1)
+        async with self._db.execute(sql, params) as db_cursor:
+            rows = await db_cursor.fetchall()
+        tasks = [row_to_task(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(tasks[-1]["id"]) if len(rows) > limit else None
+        return tasks, next_cursor
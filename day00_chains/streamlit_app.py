@@ -1,10 +1,19 @@
 import streamlit as st
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import time
+import asyncio
+import json
+import pandas as pd
 from langchain_core.output_parsers import StrOutputParser
 from langchain_tavily import TavilySearch
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnableParallel
+from utils.llm_clients import get_chat_model, warm_up
+from utils.search_cache import SearchCache
+from utils.context_compression import compress_context
+from utils.campaign import run_campaign
+from utils.rate_limiter import (get_rate_limiter, acall_with_retry, is_retryable,
+                                backoff_delay, limiter_metrics, UsageCallback)
+from utils.accounting import enable_accounting, render_accounting_sidebar
 
 # Page config
 st.set_page_config(
@@ -13,6 +22,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day00_chains")
+
 # Get API keys from secrets with fallback to UI input
 google_api_key = None
 tavily_api_key = None
@@ -40,21 +52,39 @@ else:
 
 # Initialize components
 parser = StrOutputParser()
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.4)
+
+# Shared per-key rate limiters; interactive requests overtake campaign (batch) work
+gemini_limiter = get_rate_limiter("gemini", google_api_key)
+tavily_limiter = get_rate_limiter("tavily", tavily_api_key)
+usage_callback = UsageCallback(gemini_limiter)
+
+llm = get_chat_model("gemini-2.5-flash", temperature=0.4, rate_limiter=gemini_limiter.for_langchain("interactive"))
+batch_llm = get_chat_model("gemini-2.5-flash", temperature=0.4, rate_limiter=gemini_limiter.for_langchain("batch"))
+warm_up(llm)
 
 # Tavily setup
-tool = TavilySearch(
-    max_results=10,
-    topic="general",
-)
+SEARCH_PARAMS = {"max_results": 10, "topic": "general"}
+tool = TavilySearch(**SEARCH_PARAMS)
+
+# Shared search cache (one per process, shared by every session)
+@st.cache_resource
+def get_search_cache():
+    return SearchCache(ttl_seconds=600)
 
-def tavilyResult(query: str) -> str:
-    response = tool.invoke({"query": query})
+search_cache = get_search_cache()
+
+def format_search_results(response: dict) -> str:
     content = ""
     for result in response.get("results", []):
         content += result.get("content", "") + "\n\n"
     return content.strip()
 
+async def atavilyResult(query: str, priority: str = "interactive") -> str:
+    async def fetch():
+        return format_search_results(await acall_with_retry(tool.ainvoke, {"query": query}, limiter=tavily_limiter,
+                                                            priority=priority))
+    return await search_cache.aget_or_fetch(query, fetch, SEARCH_PARAMS)
+
 # Social media templates
 # linkedIn_template = PromptTemplate.from_template("""
 # From the {search_result}, create a LinkedIn style post.
@@ -174,12 +204,65 @@ linkedIn_chain = linkedIn_template | llm | parser
 twitter_chain = twitter_template | llm | parser
 instagram_chain = instagram_template | llm | parser
 
-# Parallel chain
-parallel_chain = RunnableParallel({
+# Platform chains
+platform_chains = {
     "linkedin": linkedIn_chain,
     "twitter": twitter_chain,
     "instagram": instagram_chain
-})
+}
+
+# Campaign chains run at batch priority
+campaign_chains = {
+    "linkedin": linkedIn_template | batch_llm | parser,
+    "twitter": twitter_template | batch_llm | parser,
+    "instagram": instagram_template | batch_llm | parser
+}
+
+# Async pipeline: each platform streams into its own placeholder as soon as
+# its tokens arrive, instead of waiting for the slowest branch
+async def stream_platform(platform: str, chain, search_result: str, placeholder, latencies: dict) -> str:
+    started = time.perf_counter()
+    first_token = None
+    text = ""
+    # Retry rate-limit/transient errors, but only before any tokens were shown
+    for attempt in range(5):
+        try:
+            async for chunk in chain.astream({"search_result": search_result},
+                                             config={"callbacks": [usage_callback]}):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                text += chunk
+                placeholder.markdown(text + "▌")
+            break
+        except Exception as e:
+            if text or attempt == 4 or not is_retryable(e):
+                raise
+            placeholder.caption(f"⏳ Rate limited, retrying (attempt {attempt + 2})...")
+            await asyncio.sleep(backoff_delay(attempt))
+    placeholder.markdown(text)
+    latencies[platform] = {
+        "platform": platform.title(),
+        "first_token_s": round(first_token or 0.0, 2),
+        "total_s": round(time.perf_counter() - started, 2),
+    }
+    return text
+
+async def generate_posts(query: str, placeholders: dict, latencies: dict, context_stats: dict,
+                         token_budget: int = None) -> dict:
+    started = time.perf_counter()
+    search_result = await atavilyResult(query)
+    latencies["search"] = {"platform": "Search (Tavily)", "first_token_s": None,
+                           "total_s": round(time.perf_counter() - started, 2)}
+    
+    # Compress once before the fan-out; the context is paid for per platform
+    if token_budget:
+        search_result, stats = compress_context(search_result, query, token_budget=token_budget)
+        context_stats.update(stats)
+    posts = await asyncio.gather(*[
+        stream_platform(platform, chain, search_result, placeholders[platform], latencies)
+        for platform, chain in platform_chains.items()
+    ])
+    return dict(zip(platform_chains, posts))
 
 # Streamlit UI
 st.title("📱 Social Media Content Generator")
@@ -187,19 +270,142 @@ st.title("📱 Social Media Content Generator")
 # Search query
 search_query = st.text_input("Enter your search query:", "What happened at the last IPL 2025")
 
+# Context compression settings
+st.sidebar.markdown("### 🗜️ Context Compression")
+compress_enabled = st.sidebar.toggle("Compress search context", value=True,
+                                     help="Dedupe and rank search snippets before sending them to each platform prompt")
+token_budget = st.sidebar.slider("Context token budget", min_value=200, max_value=3000, value=800, step=100,
+                                 disabled=not compress_enabled)
+
 if st.button("Generate Social Media Posts"):
-    with st.spinner("Searching and generating content..."):
+    # One expander per platform, filled independently while streaming
+    placeholders = {}
+    for platform in platform_chains:
+        with st.expander(f"📱 {platform.title()} Post", expanded=True):
+            placeholders[platform] = st.empty()
+            placeholders[platform].caption("⏳ Waiting for search results...")
+    
+    latencies = {}
+    context_stats = {}
+    try:
+        with st.spinner("Searching and generating content..."):
+            draft = asyncio.run(generate_posts(
+                search_query, placeholders, latencies, context_stats,
+                token_budget=token_budget if compress_enabled else None
+            ))
+        
+        # Context tokens before/after compression (paid once per platform)
+        if context_stats:
+            fanout = len(platform_chains)
+            with st.expander("🗜️ Context Compression"):
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Context tokens before", context_stats["tokens_before"])
+                c2.metric("Context tokens after", context_stats["tokens_after"])
+                saved = 1 - context_stats["tokens_after"] / max(context_stats["tokens_before"], 1)
+                c3.metric(f"Input tokens saved (×{fanout} prompts)",
+                          (context_stats["tokens_before"] - context_stats["tokens_after"]) * fanout,
+                          delta=f"-{saved:.0%}", delta_color="inverse")
+                st.caption(f"Kept {context_stats['sentences_kept']} of {context_stats['sentences_total']} sentences "
+                           f"(estimated at ~4 characters per token).")
+        
+        # Per-platform latency
+        with st.expander("⏱️ Latency"):
+            st.dataframe(list(latencies.values()), hide_index=True, use_container_width=True)
+    except Exception as e:
+        if is_retryable(e):
+            st.error("⏳ Gemini/Tavily is rate limiting this key and retries were exhausted. Please try again shortly.")
+        else:
+            st.error(f"Error generating content: {str(e)}")
+        st.exception(e)
+
+# Campaign batch mode
+st.markdown("---")
+st.markdown("## 📅 Campaign Batch Mode")
+st.markdown("Plan many posts at once: every query is searched once and generated for each selected platform.")
+
+if "campaign_rows" not in st.session_state:
+    st.session_state.campaign_rows = []
+
+campaign_queries = st.text_area(
+    "Queries (one per line):",
+    value="What happened at the last IPL 2025\nLatest AI regulation news\nTop travel trends this year",
+    height=120
+)
+campaign_platforms = st.multiselect("Platforms", list(platform_chains), default=list(platform_chains),
+                                    format_func=str.title)
+campaign_concurrency = st.number_input("Global concurrency", min_value=1, max_value=32, value=4)
+st.caption("Campaign calls share the process-wide Gemini and Tavily budgets at batch priority, "
+           "so interactive requests go first.")
+
+async def stream_campaign(queries, platforms, export_path, progress, table):
+    total = len(queries) * len(platforms)
+    prepare = None
+    if compress_enabled:
+        prepare = lambda context, query: compress_context(context, query, token_budget=token_budget)[0]
+    with open(export_path, "a", encoding="utf-8") as export:
+        async for row in run_campaign(
+            queries, platforms, lambda query: atavilyResult(query, priority="batch"), campaign_chains,
+            max_concurrency=int(campaign_concurrency),
+            prepare_context=prepare
+        ):
+            export.write(json.dumps(row) + "\n")
+            export.flush()
+            st.session_state.campaign_rows.append(row)
+            done = len(st.session_state.campaign_rows)
+            progress.progress(done / total, text=f"{done}/{total} posts · {row['query'][:40]} → {row['platform']}")
+            table.dataframe(pd.DataFrame(st.session_state.campaign_rows)[["query", "platform", "latency_s", "error"]],
+                            hide_index=True, use_container_width=True)
+
+if st.button("📅 Run Campaign"):
+    queries = [q.strip() for q in campaign_queries.splitlines() if q.strip()]
+    if not queries or not campaign_platforms:
+        st.error("Please enter at least one query and select at least one platform!")
+    else:
+        st.session_state.campaign_rows = []
+        os.makedirs("campaign_exports", exist_ok=True)
+        export_path = os.path.join("campaign_exports", f"campaign_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+        progress = st.progress(0.0, text="Starting campaign...")
+        table = st.empty()
         try:
-            # Get search results
-            search_result = tavilyResult(search_query)
-            
-            # Generate social media posts
-            draft = parallel_chain.invoke({"search_result": search_result})
-            
-            # Display results
-            for platform, content in draft.items():
-                with st.expander(f"📱 {platform.title()} Post"):
-                    st.write(content)
+            asyncio.run(stream_campaign(queries, campaign_platforms, export_path, progress, table))
+            st.success(f"✅ Campaign finished · streamed to `{export_path}`")
         except Exception as e:
-            st.error(f"Error generating content: {str(e)}")
-            st.exception(e)
\ No newline at end of file
+            st.error(f"Error running campaign: {str(e)}")
+            st.exception(e)
+
+if st.session_state.campaign_rows:
+    campaign_df = pd.DataFrame(st.session_state.campaign_rows)
+    with st.expander(f"📄 Campaign Posts ({len(campaign_df)})"):
+        for row in st.session_state.campaign_rows:
+            st.markdown(f"**{row['platform'].title()} · {row['query']}**")
+            st.write(row["post"] or f"❌ {row['error']}")
+    dc1, dc2 = st.columns(2)
+    with dc1:
+        st.download_button("📥 Download JSONL",
+                           data="\n".join(json.dumps(r) for r in st.session_state.campaign_rows),
+                           file_name="campaign.jsonl", mime="application/jsonl")
+    with dc2:
+        st.download_button("📥 Download CSV", data=campaign_df.to_csv(index=False),
+                           file_name="campaign.csv", mime="text/csv")
+
+# Rate limiter stats
+st.sidebar.markdown("### 🚦 Rate Limits")
+for name, m in limiter_metrics().items():
+    st.sidebar.caption(
+        f"**{name}** · queue {m['queue_depth']} · avg wait {m['avg_wait_s']['interactive']:.1f}s interactive / "
+        f"{m['avg_wait_s']['batch']:.1f}s batch · {m['retries']} retries · {m['throttled']} throttled"
+    )
+
+# Search cache stats
+stats = search_cache.stats()
+st.sidebar.markdown("### 🔎 Search Cache")
+col1, col2 = st.sidebar.columns(2)
+col1.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+col2.metric("Entries", stats["entries"])
+st.sidebar.caption(f"{stats['hits']} hits · {stats['coalesced']} coalesced · {stats['misses']} misses")
+if st.sidebar.button("🗑️ Clear Search Cache"):
+    search_cache.clear()
+    st.rerun()
+
+# Token usage and estimated cost
+render_accounting_sidebar("day00_chains")
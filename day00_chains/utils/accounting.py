@@ -0,0 +1,387 @@
+"""
+Token and cost accounting for every LLM call made by the apps.
+
+enable_accounting(app) registers a LangChain callback for the current
+run context (the same hook LangChain uses for tracing), so every chain,
+graph node and model call made afterwards is attributed to the app
+without touching individual chains. Each call's prompt/completion
+tokens, latency and estimated cost are aggregated in memory and flushed
+to SQLite every few seconds by a background thread.
+
+CLI report (run from day00_chains/):
+
+    python -m utils.accounting --db llm_accounting.db --top 20
+"""
+
+import argparse
+import atexit
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_accounting.db")
+
+# Estimated USD per 1M tokens (input, output); unknown models fall back to DEFAULT_PRICE
+PRICES = {
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-exp": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-embedding-001": (0.15, 0.0),
+}
+DEFAULT_PRICE = (0.30, 2.50)
+
+GENERIC_RUN_NAMES = re.compile(r"^(Runnable\w*|\w*PromptTemplate|\w*OutputParser|RunnableLambda|<lambda>)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    app TEXT NOT NULL,
+    chain TEXT,
+    node TEXT,
+    model TEXT,
+    prompt_hash TEXT,
+    prompt_preview TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    latency_s REAL NOT NULL,
+    cost_usd REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_app ON llm_calls (app, ts);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_prompt ON llm_calls (prompt_hash);
+"""
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the USD cost of one call.
+
+    Args:
+        model: Model name (with or without the "models/" prefix)
+        prompt_tokens: Input tokens
+        completion_tokens: Output tokens
+
+    Returns:
+        Estimated cost in USD
+    """
+    name = (model or "").split("/")[-1]
+    input_price, output_price = PRICES.get(name, DEFAULT_PRICE)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def _template_text(serialized) -> str:
+    """Template source of a serialized prompt template, or None for other runnables."""
+    kwargs = (serialized or {}).get("kwargs") or {}
+    if isinstance(kwargs.get("template"), str):
+        return kwargs["template"]
+    if kwargs.get("messages"):
+        return repr(kwargs["messages"])
+    return None
+
+
+class Ledger:
+    """In-memory aggregates plus a write buffer flushed to SQLite on a timer."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, flush_interval: float = 10.0, max_buffer: int = 100):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._totals = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._stop = threading.Event()
+        # atexit does not run on SIGTERM, so flush on a timer to bound what a kill can lose
+        self._flusher = threading.Thread(target=self._flush_periodically, name="ledger-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def record(self, call: dict) -> None:
+        with self._lock:
+            self._buffer.append(call)
+            key = (call["app"], call["chain"], call["node"], call["model"])
+            agg = self._totals.setdefault(
+                key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_s": 0.0, "cost_usd": 0.0}
+            )
+            agg["calls"] += 1
+            for field in ("prompt_tokens", "completion_tokens", "latency_s", "cost_usd"):
+                agg[field] += call[field]
+            due = len(self._buffer) >= self.max_buffer
+        if due:
+            self.flush()
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Keep the thread alive; the rows are retried on the next tick
+                pass
+
+    def close(self) -> None:
+        """Stop the flush thread and write out whatever is still buffered."""
+        self._stop.set()
+        self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO llm_calls (ts, app, chain, node, model, prompt_hash, prompt_preview, "
+                        "prompt_tokens, completion_tokens, latency_s, cost_usd) VALUES "
+                        "(:ts, :app, :chain, :node, :model, :prompt_hash, :prompt_preview, "
+                        ":prompt_tokens, :completion_tokens, :latency_s, :cost_usd)",
+                        rows,
+                    )
+            except sqlite3.Error:
+                self._buffer[:0] = rows
+                raise
+        return len(rows)
+
+    def summary(self, app: str = None) -> list:
+        """Per (app, chain, node, model) aggregates for this process, most expensive first."""
+        with self._lock:
+            items = [
+                dict(app=k[0], chain=k[1], node=k[2], model=k[3], **v)
+                for k, v in self._totals.items()
+                if app is None or k[0] == app
+            ]
+        return sorted(items, key=lambda row: row["cost_usd"], reverse=True)
+
+
+class AccountingCallback(BaseCallbackHandler):
+    """Attributes every LLM call to (app, chain, node) and records it in a Ledger."""
+
+    def __init__(self, app: str, ledger: Ledger):
+        self.app = app
+        self.ledger = ledger
+        self._runs = {}
+        self._templates = {}
+        self._llm_runs = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        template = _template_text(serialized)
+        with self._lock:
+            self._runs[run_id] = (name, parent_run_id, (metadata or {}).get("langgraph_node"))
+            if template is not None and parent_run_id is not None:
+                # The model call that consumes this prompt runs under the same parent
+                self._templates[parent_run_id] = template
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+            self._templates.pop(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+            self._templates.pop(run_id, None)
+
+    def _template(self, parent_run_id):
+        """Template of the nearest ancestor that ran a prompt template, if any."""
+        run_id = parent_run_id
+        with self._lock:
+            while run_id is not None:
+                if run_id in self._templates:
+                    return self._templates[run_id]
+                run_id = self._runs[run_id][1] if run_id in self._runs else None
+        return None
+
+    def _attribution(self, parent_run_id, metadata):
+        """(chain, node): nearest non-generic ancestor name, and graph node or direct parent."""
+        names = []
+        node = (metadata or {}).get("langgraph_node")
+        run_id = parent_run_id
+        with self._lock:
+            while run_id in self._runs:
+                name, run_id, graph_node = self._runs[run_id]
+                names.append(name)
+                node = node or graph_node
+        chain = next((n for n in names if not GENERIC_RUN_NAMES.match(n)), names[-1] if names else "direct")
+        return chain, node or (names[0] if names else None)
+
+    def _start(self, run_id, parent_run_id, metadata, prompt_text, kwargs, serialized):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("kwargs", {}).get("model")
+        chain, node = self._attribution(parent_run_id, metadata)
+        preview = " ".join(prompt_text.split())[:200]
+        # Same call site and template → same hash, whatever the inputs; the text stays in the preview
+        template = self._template(parent_run_id) or ""
+        prompt_key = "\0".join((chain or "", node or "", template))
+        with self._lock:
+            self._llm_runs[run_id] = {
+                "started": time.perf_counter(),
+                "model": (model or "unknown").split("/")[-1],
+                "chain": chain,
+                "node": node,
+                "prompt_preview": preview,
+                "prompt_hash": hashlib.sha256(prompt_key.encode("utf-8")).hexdigest()[:16],
+                "prompt_chars": len(prompt_text),
+            }
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, metadata, "\n".join(prompts), kwargs, serialized)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        text = "\n".join(
+            m.content if isinstance(m.content, str) else str(m.content) for batch in messages for m in batch
+        )
+        self._start(run_id, parent_run_id, metadata, text, kwargs, serialized)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens:
+            # Providers that report no usage: fall back to ~4 characters per token
+            prompt_tokens = run["prompt_chars"] // 4
+            completion_tokens = completion_tokens or sum(
+                len(g.text) for gens in response.generations for g in gens
+            ) // 4
+        self.ledger.record({
+            "ts": time.time(),
+            "app": self.app,
+            "chain": run["chain"],
+            "node": run["node"],
+            "model": run["model"],
+            "prompt_hash": run["prompt_hash"],
+            "prompt_preview": run["prompt_preview"],
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_s": time.perf_counter() - run["started"],
+            "cost_usd": estimate_cost(run["model"], prompt_tokens, completion_tokens),
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+
+_ledgers = {}
+_handlers = {}
+_registry_lock = threading.Lock()
+_accounting_var = ContextVar("llm_accounting_callback", default=None)
+_hook_registered = False
+
+
+def get_ledger(db_path: str = DEFAULT_DB_PATH) -> Ledger:
+    """Process-wide ledger for a SQLite path."""
+    with _registry_lock:
+        if db_path not in _ledgers:
+            _ledgers[db_path] = Ledger(db_path)
+        return _ledgers[db_path]
+
+
+def enable_accounting(app: str, db_path: str = DEFAULT_DB_PATH) -> AccountingCallback:
+    """
+    Attribute every LangChain call in the current run context to `app`.
+
+    Call once near the top of a Streamlit script; the handler is reused
+    across reruns and inherited by threads and event loops started from
+    the script (RunnableParallel, batch, asyncio.run).
+
+    Args:
+        app: App name used for attribution
+        db_path: SQLite file the ledger flushes to
+
+    Returns:
+        The AccountingCallback installed for this app
+    """
+    global _hook_registered
+    from langchain_core.tracers.context import register_configure_hook
+
+    with _registry_lock:
+        if not _hook_registered:
+            register_configure_hook(_accounting_var, inheritable=True)
+            _hook_registered = True
+    ledger = get_ledger(db_path)
+    with _registry_lock:
+        handler = _handlers.get((app, db_path))
+        if handler is None:
+            handler = _handlers[(app, db_path)] = AccountingCallback(app, ledger)
+    _accounting_var.set(handler)
+    return handler
+
+
+def render_accounting_sidebar(app: str, db_path: str = DEFAULT_DB_PATH) -> None:
+    """Live sidebar widget with this app's calls, tokens and estimated cost."""
+    import streamlit as st
+
+    rows = get_ledger(db_path).summary(app)
+    calls = sum(r["calls"] for r in rows)
+    tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in rows)
+    cost = sum(r["cost_usd"] for r in rows)
+    st.sidebar.markdown("### 💰 Token Usage")
+    c1, c2, c3 = st.sidebar.columns(3)
+    c1.metric("Calls", calls)
+    c2.metric("Tokens", f"{tokens:,}")
+    c3.metric("Est. $", f"{cost:.4f}")
+    if rows:
+        with st.sidebar.expander("By chain / node"):
+            st.dataframe(
+                [{"chain": r["chain"], "node": r["node"], "calls": r["calls"],
+                  "tokens": r["prompt_tokens"] + r["completion_tokens"],
+                  "avg_s": round(r["latency_s"] / r["calls"], 2), "cost_usd": round(r["cost_usd"], 5)}
+                 for r in rows],
+                hide_index=True, use_container_width=True
+            )
+
+
+def report(db_path: str = DEFAULT_DB_PATH, top: int = 20, app: str = None) -> list:
+    """Most expensive prompts (grouped by prompt fingerprint) from the SQLite ledger."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT app, chain, node, model, COUNT(*) AS calls, SUM(prompt_tokens), SUM(completion_tokens), "
+            "AVG(latency_s), SUM(cost_usd) AS cost, MAX(prompt_preview) "
+            "FROM llm_calls WHERE (? IS NULL OR app = ?) "
+            "GROUP BY app, chain, node, model, prompt_hash ORDER BY cost DESC LIMIT ?",
+            (app, app, top),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Rank the most expensive prompts recorded by the apps.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Accounting SQLite file")
+    parser.add_argument("--top", type=int, default=20, help="Number of prompts to show")
+    parser.add_argument("--app", default=None, help="Only show one app")
+    args = parser.parse_args(argv)
+
+    rows = report(args.db, args.top, args.app)
+    if not rows:
+        print("No LLM calls recorded yet.")
+        return
+    print(f"{'#':>3}  {'cost $':>10}  {'calls':>6}  {'in tok':>9}  {'out tok':>9}  {'avg s':>6}  app / chain / node / model")
+    for i, (app, chain, node, model, calls, p_tok, c_tok, avg_s, cost, preview) in enumerate(rows, 1):
+        print(f"{i:>3}  {cost:>10.5f}  {calls:>6}  {p_tok:>9}  {c_tok:>9}  {avg_s:>6.2f}  "
+              f"{app} / {chain} / {node} / {model}")
+        print(f"{'':>5}↳ {preview[:110]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Campaign batch mode: many queries x many platforms.
+
+Every search and every post generation is a task. All tasks share one
+global concurrency limit. Provider quotas are not enforced here: `search`
+and `chains` are expected to go through the process-wide limiters in
+utils.rate_limiter at batch priority, so a campaign shares each key's
+budget with every other caller and yields to interactive requests. Rows
+are yielded as soon as they finish so callers can stream them to an
+export.
+"""
+
+import asyncio
+import time
+
+
+async def run_campaign(queries, platforms, search, chains: dict, max_concurrency: int = 4,
+                       prepare_context=None):
+    """
+    Generate posts for every (query, platform) pair.
+
+    Args:
+        queries: Search queries to run
+        platforms: Platform names (keys of `chains`) to generate for
+        search: Coroutine function query -> search context string (rate limited by the caller)
+        chains: Mapping of platform name -> runnable taking {"search_result": ...} (rate limited by the caller)
+        max_concurrency: Global cap on in-flight search and generation tasks
+        prepare_context: Optional function (context, query) -> context applied before fan-out
+
+    Yields:
+        One dict per (query, platform) with post, latency_s, queue_wait_s (time waiting for a
+        concurrency slot) and error
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = asyncio.Queue()
+
+    async def limited(coro_fn):
+        queued = time.perf_counter()
+        async with semaphore:
+            started = time.perf_counter()
+            value = await coro_fn()
+            return value, time.perf_counter() - started, started - queued
+
+    async def generate(query, platform, context):
+        row = {"query": query, "platform": platform, "post": "", "latency_s": None,
+               "queue_wait_s": None, "error": None}
+        try:
+            post, elapsed, waited = await limited(lambda: chains[platform].ainvoke({"search_result": context}))
+            row.update(post=post, latency_s=round(elapsed, 2), queue_wait_s=round(waited, 2))
+        except Exception as e:
+            row["error"] = str(e)
+        await results.put(row)
+
+    async def run_query(query):
+        try:
+            context, _, _ = await limited(lambda: search(query))
+            if prepare_context:
+                context = prepare_context(context, query)
+        except Exception as e:
+            for platform in platforms:
+                await results.put({"query": query, "platform": platform, "post": "", "latency_s": None,
+                                   "queue_wait_s": None, "error": f"search failed: {e}"})
+            return
+        await asyncio.gather(*[generate(query, platform, context) for platform in platforms])
+
+    async def run_all():
+        try:
+            await asyncio.gather(*[run_query(q) for q in queries])
+        finally:
+            await results.put(None)
+
+    runner = asyncio.create_task(run_all())
+    try:
+        while True:
+            row = await results.get()
+            if row is None:
+                break
+            yield row
+    finally:
+        if not runner.done():
+            runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
@@ -0,0 +1,103 @@
+"""
+Search-context compression before prompt fan-out.
+
+The search blob is injected into every platform prompt, so each token in
+it is paid for once per platform. compress_context removes near-duplicate
+snippets and sentences, ranks what is left against the query, and keeps
+the best sentences (in their original order) up to a token budget.
+"""
+
+import math
+import re
+from collections import Counter
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "what", "which",
+    "who", "when", "where", "how", "did", "do", "does", "he", "she", "they", "their", "his", "her",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate (about 4 characters per token for English text).
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _terms(text: str) -> list:
+    return [w for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def split_sentences(text: str) -> list:
+    """Split text into sentences on terminal punctuation and blank lines."""
+    parts = re.split(r"(?<=[.!?])\s+|\n{2,}", text)
+    return [p.strip() for p in parts if p and p.strip()]
+
+
+def _is_near_duplicate(terms: set, seen: list, threshold: float) -> bool:
+    for other in seen:
+        union = terms | other
+        if union and len(terms & other) / len(union) >= threshold:
+            return True
+    return False
+
+
+def compress_context(text: str, query: str, token_budget: int = 600, dedupe_threshold: float = 0.8):
+    """
+    Compress search context for a query.
+
+    Args:
+        text: Concatenated search result content
+        query: The search query the context should answer
+        token_budget: Maximum estimated tokens to keep
+        dedupe_threshold: Jaccard similarity above which sentences count as duplicates
+
+    Returns:
+        Tuple of (compressed text, stats dict with tokens_before/tokens_after/sentences_kept)
+    """
+    sentences = []
+    seen = []
+    for sentence in split_sentences(text):
+        terms = set(_terms(sentence))
+        if not terms or _is_near_duplicate(terms, seen, dedupe_threshold):
+            continue
+        seen.append(terms)
+        sentences.append(sentence)
+
+    # Rank by query-term overlap weighted by inverse document frequency
+    doc_freq = Counter(term for terms in seen for term in terms)
+    query_terms = set(_terms(query))
+    n = len(sentences) or 1
+
+    def score(idx):
+        counts = Counter(_terms(sentences[idx]))
+        length_norm = math.sqrt(sum(counts.values())) or 1.0
+        relevance = sum(math.log(1 + n / doc_freq[t]) * counts[t] for t in query_terms if t in counts)
+        # Small boost for informative sentences so ties don't favour filler
+        salience = sum(math.log(1 + n / doc_freq[t]) for t in counts) / length_norm
+        return relevance * 2 + salience * 0.1
+
+    ranked = sorted(range(len(sentences)), key=score, reverse=True)
+    kept, used = [], 0
+    for idx in ranked:
+        cost = estimate_tokens(sentences[idx]) + 1
+        if used + cost > token_budget:
+            continue
+        kept.append(idx)
+        used += cost
+
+    compressed = " ".join(sentences[i] for i in sorted(kept))
+    stats = {
+        "tokens_before": estimate_tokens(text),
+        "tokens_after": estimate_tokens(compressed),
+        "sentences_total": len(split_sentences(text)),
+        "sentences_kept": len(kept),
+    }
+    return compressed, stats
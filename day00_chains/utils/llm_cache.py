@@ -0,0 +1,241 @@
+"""
+LLM response cache layer shared by all the Streamlit apps.
+
+Implements LangChain's BaseCache, so a chat model built with
+``cache=...`` looks every call up by (prompt, model parameters) before it
+is sent. The cache is attached to model instances rather than installed
+globally, so one app (or session) turning caching on or off never
+affects another. Storage is pluggable: an in-memory LRU, a SQLite file,
+or any Redis-compatible client. Each app gets its own key namespace and
+its own hit/miss counters.
+
+Usage:
+
+    from utils.llm_cache import get_llm_cache
+    cache = get_llm_cache("day013_langgraphDAG", backend="sqlite")
+    llm = get_chat_model("gemini-2.5-flash", cache=cache)
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class MemoryLRUBackend:
+    """In-process LRU store."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self, prefix: str = "") -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteBackend:
+    """SQLite file store with an optional TTL."""
+
+    def __init__(self, path: str = "llm_cache.db", ttl_seconds: float = None):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)", (key, value, time.time())
+            )
+
+    def clear(self, prefix: str = "") -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache WHERE key LIKE ?", (prefix + "%",))
+
+
+class RedisBackend:
+    """Store on any Redis-compatible client (redis-py, or FakeRedis below)."""
+
+    def __init__(self, client, ttl_seconds: int = None):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str):
+        value = self.client.get(key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str) -> None:
+        self.client.set(key, value, ex=self.ttl_seconds)
+
+    def clear(self, prefix: str = "") -> None:
+        for key in list(self.client.scan_iter(match=prefix + "*")):
+            self.client.delete(key)
+
+
+class FakeRedis:
+    """Minimal local stand-in for a Redis client (get/set with ex/delete/scan_iter)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and time.time() > expires_at:
+                del self._data[key]
+                return None
+            return value.encode("utf-8")
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+        return iter(keys)
+
+
+class LLMResponseCache(BaseCache):
+    """LangChain cache that stores generations in a namespaced backend."""
+
+    def __init__(self, namespace: str, backend):
+        self.namespace = namespace
+        self.backend = backend
+        with _metrics_lock:
+            _metrics.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0})
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        digest = hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+        return f"llm:{self.namespace}:{digest}"
+
+    def _count(self, field: str) -> None:
+        with _metrics_lock:
+            _metrics[self.namespace][field] += 1
+
+    def lookup(self, prompt: str, llm_string: str):
+        raw = self.backend.get(self._key(prompt, llm_string))
+        if raw is None:
+            self._count("misses")
+            return None
+        try:
+            generations = loads(raw)
+        except Exception:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        self.backend.set(self._key(prompt, llm_string), dumps(list(return_val)))
+        self._count("writes")
+
+    def clear(self, **kwargs) -> None:
+        self.backend.clear(f"llm:{self.namespace}:")
+
+
+def make_backend(backend: str = "memory", **options):
+    """
+    Build a storage backend by name.
+
+    Args:
+        backend: "memory", "sqlite" or "redis"
+        **options: max_entries (memory), path/ttl_seconds (sqlite),
+            client/url/ttl_seconds (redis; defaults to a local FakeRedis)
+
+    Returns:
+        A backend object with get/set/clear
+    """
+    if backend == "memory":
+        return MemoryLRUBackend(max_entries=options.get("max_entries", 1000))
+    if backend == "sqlite":
+        return SQLiteBackend(path=options.get("path", "llm_cache.db"), ttl_seconds=options.get("ttl_seconds"))
+    if backend == "redis":
+        client = options.get("client")
+        if client is None and options.get("url"):
+            import redis
+
+            client = redis.Redis.from_url(options["url"])
+        return RedisBackend(client or FakeRedis(), ttl_seconds=options.get("ttl_seconds"))
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def get_llm_cache(namespace: str, backend: str = "memory", **options) -> LLMResponseCache:
+    """
+    Get the process-wide cache for a namespace, to pass as a model's ``cache=``.
+
+    Calling it again with the same arguments returns the same cache, so
+    model clients keyed on it are reused too.
+
+    Args:
+        namespace: Per-app key prefix, also used for metrics
+        backend: "memory", "sqlite" or "redis"
+        **options: Passed to make_backend
+
+    Returns:
+        The shared LLMResponseCache
+    """
+    # Streamlit reruns call this on every interaction; reuse the same cache
+    key = (namespace, backend, repr(sorted(options.items(), key=lambda item: item[0])))
+    with _shared_lock:
+        cache = _shared.get(key)
+        if cache is None:
+            cache = LLMResponseCache(namespace, make_backend(backend, **options))
+            _shared[key] = cache
+    return cache
+
+
+def cache_metrics(namespace: str = None) -> dict:
+    """Hit/miss/write counters and hit rate, for one namespace or all of them."""
+    with _metrics_lock:
+        snapshot = {ns: dict(m) for ns, m in _metrics.items()}
+    for m in snapshot.values():
+        lookups = m["hits"] + m["misses"]
+        m["hit_rate"] = m["hits"] / lookups if lookups else 0.0
+    return snapshot.get(namespace, {}) if namespace else snapshot
@@ -0,0 +1,153 @@
+"""
+Process-wide cached Gemini clients shared by all the Streamlit apps.
+
+Building ChatGoogleGenerativeAI creates a fresh API client and HTTP
+connection pool each time, so apps that build it per rerun or per button
+press pay for client construction and a cold connection on every
+request. The factories here return one client per
+(kind, model, temperature, api key hash, options) for the whole process,
+so connections are reused across reruns, sessions and apps.
+
+Usage from another app folder:
+
+    import os, sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+    from utils.llm_clients import get_chat_model
+
+    llm = get_chat_model("gemini-2.5-flash", temperature=0.2, api_key=gemini_api_key)
+"""
+
+import hashlib
+import os
+import threading
+
+_clients = {}
+_warmed = set()
+_lock = threading.Lock()
+
+
+def _api_key_hash(api_key: str = None) -> str:
+    key = api_key or os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY") or ""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _get_or_create(cache_key: tuple, factory):
+    with _lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            client = factory()
+            _clients[cache_key] = client
+        return client
+
+
+def _api_kwargs(api_key: str = None) -> dict:
+    return {"google_api_key": api_key} if api_key else {}
+
+
+def get_chat_model(model: str = "gemini-2.5-flash", temperature: float = None, api_key: str = None, **kwargs):
+    """
+    Get a shared ChatGoogleGenerativeAI client.
+
+    Args:
+        model: Gemini model name
+        temperature: Sampling temperature (None keeps the model default)
+        api_key: Gemini API key (falls back to GOOGLE_API_KEY / GEMINI_API_KEY)
+        **kwargs: Extra constructor options (part of the cache key)
+
+    Returns:
+        A ChatGoogleGenerativeAI instance shared by all callers with the same settings
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    cache_key = ("chat", model, temperature, _api_key_hash(api_key), tuple(sorted(kwargs.items())))
+
+    def factory():
+        options = dict(kwargs, **_api_kwargs(api_key))
+        if temperature is not None:
+            options["temperature"] = temperature
+        return ChatGoogleGenerativeAI(model=model, **options)
+
+    return _get_or_create(cache_key, factory)
+
+
+def get_llm(model: str = "gemini-2.5-flash", temperature: float = None, api_key: str = None, **kwargs):
+    """
+    Get a shared GoogleGenerativeAI (text completion) client.
+
+    Args:
+        model: Gemini model name
+        temperature: Sampling temperature (None keeps the model default)
+        api_key: Gemini API key (falls back to GOOGLE_API_KEY / GEMINI_API_KEY)
+        **kwargs: Extra constructor options (part of the cache key)
+
+    Returns:
+        A GoogleGenerativeAI instance shared by all callers with the same settings
+    """
+    from langchain_google_genai import GoogleGenerativeAI
+
+    cache_key = ("llm", model, temperature, _api_key_hash(api_key), tuple(sorted(kwargs.items())))
+
+    def factory():
+        options = dict(kwargs, **_api_kwargs(api_key))
+        if temperature is not None:
+            options["temperature"] = temperature
+        return GoogleGenerativeAI(model=model, **options)
+
+    return _get_or_create(cache_key, factory)
+
+
+def get_embeddings(model: str = "models/gemini-embedding-001", api_key: str = None, **kwargs):
+    """
+    Get a shared GoogleGenerativeAIEmbeddings client.
+
+    Args:
+        model: Embedding model name
+        api_key: Gemini API key (falls back to GOOGLE_API_KEY / GEMINI_API_KEY)
+        **kwargs: Extra constructor options (part of the cache key)
+
+    Returns:
+        A GoogleGenerativeAIEmbeddings instance shared by all callers with the same settings
+    """
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    cache_key = ("embeddings", model, None, _api_key_hash(api_key), tuple(sorted(kwargs.items())))
+    return _get_or_create(
+        cache_key, lambda: GoogleGenerativeAIEmbeddings(model=model, **dict(kwargs, **_api_kwargs(api_key)))
+    )
+
+
+def warm_up(client, background: bool = True):
+    """
+    Open the client's connection ahead of the first real request.
+
+    Sends a one-token request so TLS and the HTTP/2 connection are already
+    established when the user presses a button. Each client is warmed once.
+
+    Args:
+        client: A client returned by one of the factories above
+        background: Run the warm-up in a daemon thread instead of blocking
+
+    Returns:
+        The thread running the warm-up, or None if it ran inline or was skipped
+    """
+    with _lock:
+        if id(client) in _warmed:
+            return None
+        _warmed.add(id(client))
+
+    def run():
+        try:
+            if hasattr(client, "embed_query"):
+                client.embed_query("ping")
+            else:
+                client.bind(max_output_tokens=1).invoke("ping")
+        except Exception:
+            # Warm-up is best effort; the real request will surface any error
+            pass
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,353 @@
+"""
+Process-wide rate limiting and retry scheduling for Gemini and tool calls.
+
+Apps that share one API key share one RateLimiter per (provider, key),
+with a requests-per-minute bucket and an optional tokens-per-minute
+bucket. Waiting callers are served in priority order, so interactive
+requests overtake queued batch work. Calls that still hit a 429 or a
+transient error are retried with full-jitter exponential backoff.
+
+Three ways to plug it in:
+
+- Chat models: pass ``limiter.for_langchain("interactive")`` as the
+  ``rate_limiter=`` argument of the model (LangChain's own hook), and add
+  ``UsageCallback(limiter)`` to debit the real token usage. Wrapping the
+  model in ``retrying(llm)`` adds the retry policy per model call, so one
+  throttled call is retried without re-running the rest of the chain.
+- Plain functions (tool HTTP calls): ``call_with_retry`` /
+  ``acall_with_retry``.
+- Embeddings: ``RateLimitedEmbeddings(embeddings, limiter)`` budgets and
+  retries each upstream batch separately.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.rate_limiters import BaseRateLimiter
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+DEFAULT_BUDGETS = {
+    "gemini": {"requests_per_minute": 60, "tokens_per_minute": 250_000},
+    "tavily": {"requests_per_minute": 60, "tokens_per_minute": None},
+}
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_MARKERS = ("429", "resource_exhausted", "rate limit", "quota", "timed out", "timeout",
+                     "temporarily unavailable", "503", "deadline exceeded")
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `capacity`."""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Debit units; the level may go negative to absorb under-estimates."""
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """Priority-ordered request and token budgets for one provider key."""
+
+    def __init__(self, name: str, requests_per_minute: float = 60, tokens_per_minute: float = None,
+                 burst: int = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, burst or max(1, requests_per_minute / 6))
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._adapters = {}
+        self._metrics = {
+            "acquired": 0, "retries": 0, "throttled": 0, "failures": 0,
+            "wait_s_total": {p: 0.0 for p in PRIORITIES},
+            "wait_s_max": {p: 0.0 for p in PRIORITIES},
+            "acquired_by_priority": {p: 0 for p in PRIORITIES},
+        }
+
+    def acquire(self, tokens: float = 0, priority: str = "interactive", blocking: bool = True):
+        """
+        Wait for request (and token) budget.
+
+        Args:
+            tokens: Estimated tokens for the call (0 to skip the token budget)
+            priority: "interactive" or "batch"; interactive waiters go first
+            blocking: If False, return None immediately when budget is not available
+
+        Returns:
+            Seconds spent waiting, or None if non-blocking and no budget
+        """
+        ticket = (PRIORITIES[priority], next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    delay = None
+                    if self._waiters[0] == ticket:
+                        delay = self.requests.wait_time(1)
+                        if self.tokens:
+                            # Without an estimate, wait until usage debited by
+                            # earlier calls has been paid back
+                            delay = max(delay, self.tokens.wait_time(max(tokens, 1)))
+                        if delay <= 0:
+                            self.requests.take(1)
+                            if self.tokens and tokens:
+                                self.tokens.take(tokens)
+                            break
+                    if not blocking:
+                        return None
+                    self._cond.wait(timeout=min(delay, 1.0) if delay else 1.0)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._metrics["acquired"] += 1
+            self._metrics["acquired_by_priority"][priority] += 1
+            self._metrics["wait_s_total"][priority] += waited
+            self._metrics["wait_s_max"][priority] = max(self._metrics["wait_s_max"][priority], waited)
+        return waited
+
+    async def aacquire(self, tokens: float = 0, priority: str = "interactive", blocking: bool = True):
+        """Async acquire; waits in a worker thread so the event loop stays free."""
+        return await asyncio.to_thread(self.acquire, tokens, priority, blocking)
+
+    def record_usage(self, tokens: float) -> None:
+        """Debit actual token usage reported after a call."""
+        if self.tokens and tokens:
+            with self._cond:
+                self.tokens.take(tokens)
+
+    def _count(self, field: str) -> None:
+        with self._cond:
+            self._metrics[field] += 1
+
+    def for_langchain(self, priority: str = "interactive") -> "LangChainRateLimiter":
+        """Adapter for a chat model's ``rate_limiter=`` argument (one per priority)."""
+        with self._cond:
+            if priority not in self._adapters:
+                self._adapters[priority] = LangChainRateLimiter(self, priority)
+            return self._adapters[priority]
+
+    def metrics(self) -> dict:
+        with self._cond:
+            m = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._metrics.items()}
+            m["queue_depth"] = len(self._waiters)
+        m["avg_wait_s"] = {
+            p: (m["wait_s_total"][p] / m["acquired_by_priority"][p]) if m["acquired_by_priority"][p] else 0.0
+            for p in PRIORITIES
+        }
+        return m
+
+
+class LangChainRateLimiter(BaseRateLimiter):
+    """Exposes a shared RateLimiter through LangChain's BaseRateLimiter interface."""
+
+    def __init__(self, limiter: RateLimiter, priority: str = "interactive"):
+        self.limiter = limiter
+        self.priority = priority
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.limiter.acquire(0, self.priority, blocking) is not None
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.limiter.aacquire(0, self.priority, blocking) is not None
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Debits the token budget with the usage reported by each LLM response."""
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs):
+        total = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                total += usage.get("total_tokens", 0)
+        self.limiter.record_usage(total)
+
+
+_limiters = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, api_key: str = None, **budgets) -> RateLimiter:
+    """
+    Get the process-wide limiter for a provider and API key.
+
+    Args:
+        provider: "gemini", "tavily" or any other provider name
+        api_key: Key the budget belongs to (falls back to the usual env vars)
+        **budgets: requests_per_minute / tokens_per_minute / burst, used on first creation
+
+    Returns:
+        The shared RateLimiter for (provider, key)
+    """
+    key = api_key or os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY") or ""
+    registry_key = (provider, hashlib.sha256(key.encode("utf-8")).hexdigest()[:16])
+    with _registry_lock:
+        limiter = _limiters.get(registry_key)
+        if limiter is None:
+            options = dict(DEFAULT_BUDGETS.get(provider, {"requests_per_minute": 60}), **budgets)
+            limiter = RateLimiter(provider, **options)
+            _limiters[registry_key] = limiter
+        return limiter
+
+
+def limiter_metrics() -> dict:
+    """Metrics for every limiter in the process, keyed by provider."""
+    with _registry_lock:
+        limiters = list(_limiters.items())
+    return {f"{provider}:{key_hash[:6]}": limiter.metrics() for (provider, key_hash), limiter in limiters}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for rate-limit (429) and transient upstream errors."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS:
+        return True
+    message = f"{type(exc).__name__} {exc}".lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+class _RetryableMeta(type):
+    def __instancecheck__(cls, instance):
+        return isinstance(instance, Exception) and is_retryable(instance)
+
+
+class RetryableError(Exception, metaclass=_RetryableMeta):
+    """
+    Matches, via isinstance, every exception `is_retryable` accepts.
+
+    Lets type-based retry hooks such as ``with_retry(retry_if_exception_type=...)``
+    use the same policy as call_with_retry.
+    """
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """Full-jitter exponential backoff for the given 0-based attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn, *args, limiter: RateLimiter = None, tokens: float = 0, priority: str = "interactive",
+                    max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 30.0, **kwargs):
+    """Call fn(*args, **kwargs) under the limiter, retrying retryable errors with backoff."""
+    for attempt in range(max_attempts):
+        if limiter:
+            limiter.acquire(tokens, priority)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt == max_attempts - 1:
+                if limiter:
+                    limiter._count("failures")
+                raise
+            if limiter:
+                limiter._count("retries")
+                if "429" in str(e) or getattr(e, "status_code", None) == 429:
+                    limiter._count("throttled")
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+async def acall_with_retry(fn, *args, limiter: RateLimiter = None, tokens: float = 0,
+                           priority: str = "interactive", max_attempts: int = 5, base_delay: float = 1.0,
+                           max_delay: float = 30.0, **kwargs):
+    """Async variant of call_with_retry; fn is a coroutine function."""
+    for attempt in range(max_attempts):
+        if limiter:
+            await limiter.aacquire(tokens, priority)
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt == max_attempts - 1:
+                if limiter:
+                    limiter._count("failures")
+                raise
+            if limiter:
+                limiter._count("retries")
+                if "429" in str(e) or getattr(e, "status_code", None) == 429:
+                    limiter._count("throttled")
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that takes one limiter request per upstream batch.
+
+    A large ingest is split into `batch_size` texts per call, so the request
+    budget reflects the real number of API calls and a retry repeats only
+    the batch that failed.
+    """
+
+    def __init__(self, embeddings, limiter: RateLimiter, batch_size: int = 100,
+                 document_priority: str = "batch", query_priority: str = "interactive"):
+        self.embeddings = embeddings
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.document_priority = document_priority
+        self.query_priority = query_priority
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors += call_with_retry(self.embeddings.embed_documents, texts[start:start + self.batch_size],
+                                       limiter=self.limiter, priority=self.document_priority)
+        return vectors
+
+    def embed_query(self, text):
+        return call_with_retry(self.embeddings.embed_query, text, limiter=self.limiter, priority=self.query_priority)
+
+    async def aembed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors += await acall_with_retry(self.embeddings.aembed_documents, texts[start:start + self.batch_size],
+                                              limiter=self.limiter, priority=self.document_priority)
+        return vectors
+
+    async def aembed_query(self, text):
+        return await acall_with_retry(self.embeddings.aembed_query, text, limiter=self.limiter,
+                                      priority=self.query_priority)
+
+
+def retrying(runnable, max_attempts: int = 5):
+    """
+    Retry rate-limit and transient errors with jittered exponential backoff (LangChain's with_retry).
+
+    Wrap the chat model rather than a whole pipeline: other errors (bad
+    output, auth failures) are raised at once, and a retry repeats one call
+    instead of every branch of a fan-out.
+    """
+    return runnable.with_retry(
+        retry_if_exception_type=(RetryableError,),
+        wait_exponential_jitter=True,
+        stop_after_attempt=max_attempts,
+        exponential_jitter_params={"initial": 1, "max": 30},
+    )
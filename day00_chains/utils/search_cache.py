@@ -0,0 +1,114 @@
+"""
+Process-wide search result cache with request coalescing.
+
+Results are cached for a TTL under a key built from the normalised query
+and the search parameters. Identical lookups that arrive while one is
+already in flight wait for that request instead of issuing their own
+(single-flight), which keeps trending queries from hammering the search
+API when many users ask at once.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+
+def normalise_query(query: str) -> str:
+    """
+    Normalise a search query for cache keying.
+
+    Args:
+        query: The raw query typed by the user
+
+    Returns:
+        Lower-cased query with collapsed whitespace and no trailing punctuation
+    """
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+class SearchCache:
+    """TTL cache with single-flight coalescing, safe across threads and event loops."""
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, params: dict = None) -> str:
+        return json.dumps({"q": normalise_query(query), "params": params or {}}, sort_keys=True)
+
+    def _lookup(self, key: str):
+        """Return ("hit", value), ("wait", future) or ("lead", future). Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+            self.hits += 1
+            return "hit", entry[1]
+        if key in self._in_flight:
+            self.coalesced += 1
+            return "wait", self._in_flight[key]
+        self.misses += 1
+        future = Future()
+        self._in_flight[key] = future
+        return "lead", future
+
+    def _finish(self, key: str, future: Future, value=None, error: BaseException = None) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if error is None:
+                self._entries[key] = (time.monotonic(), value)
+                if len(self._entries) > self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                    del self._entries[oldest]
+        if error is None:
+            future.set_result(value)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # The leader was cancelled (e.g. a rerun); waiters fetch again instead of inheriting it
+            future.cancel()
+
+    async def aget_or_fetch(self, query: str, afetch, params: dict = None):
+        """Return a cached result or await afetch() once for all concurrent callers."""
+        key = self.make_key(query, params)
+        with self._lock:
+            state, value = self._lookup(key)
+        if state == "hit":
+            return value
+        if state == "wait":
+            # asyncio.wait never cancels the leader's future, even if this waiter is cancelled
+            leader = asyncio.wrap_future(value)
+            await asyncio.wait([leader])
+            if leader.cancelled():
+                return await self.aget_or_fetch(query, afetch, params)
+            return leader.result()
+        try:
+            result = await afetch()
+        except BaseException as e:
+            self._finish(key, value, error=e)
+            raise
+        self._finish(key, value, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,13 +1,19 @@
 import streamlit as st
 import os
-import requests
-from langchain.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
+import pandas as pd
 from langchain.agents import create_agent
-from langchain_community.tools import DuckDuckGoSearchRun
+from langgraph.checkpoint.memory import MemorySaver
 import sys
-from io import StringIO
-import contextlib
+import time
+import uuid
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.accounting import enable_accounting, render_accounting_sidebar
+from travel_tools import (create_tools, run_async, shaping_stats, tool_cache, ToolTimingCallback, WEATHER_TTL_S,
+                          FLIGHT_TTL_S)
 
 # Page config
 st.set_page_config(
@@ -16,6 +22,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day010_ai_travel_agent")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -70,107 +79,31 @@ st.sidebar.markdown("""
 - "Search for best travel destinations in India"
 """)
 
-# Helper function to capture stdout
-@contextlib.contextmanager
-def capture_stdout():
-    old_stdout = sys.stdout
-    sys.stdout = captured_output = StringIO()
-    try:
-        yield captured_output
-    finally:
-        sys.stdout = old_stdout
+# Conversation checkpoints for every session, kept apart by a random thread_id
+@st.cache_resource
+def get_checkpointer():
+    """Process-wide checkpointer shared by the cached agents"""
+    return MemorySaver()
 
-# Initialize tools
-def create_tools(weather_key, aviation_key):
-    """Create all tools for the travel assistant"""
-    
-    # Search tool
-    search_tool = DuckDuckGoSearchRun()
-    
-    # Weather tool
-    @tool
-    def get_weather_data(city: str) -> str:
-        """
-        This function fetches the current weather data for a given city
-        
-        Args:
-            city: The name of the city to get weather for
-        """
-        url = f'https://api.weatherstack.com/current?access_key={weather_key}&query={city}'
-        try:
-            response = requests.get(url, timeout=10)
-            return response.json()
-        except Exception as e:
-            return f"Error fetching weather: {str(e)}"
-    
-    # Addition tool
-    @tool
-    def addition(a: str, b: str) -> str:
-        """
-        This function adds two numbers
-        
-        Args:
-            a: First number as string
-            b: Second number as string
-        """
-        try:
-            return str(int(a) + int(b))
-        except ValueError:
-            return "Error: Invalid numbers provided"
-    
-    # Flight info tool
-    @tool
-    def flight_info_tool(arg_city_name: str, my_date: str) -> str:
-        """
-        This function suggests available flights from Delhi to the destination only if a travel date is provided.
-        
-        Args:
-            arg_city_name: The destination city name
-            my_date: The travel date in YYYY-MM-DD format
-        """
-        # Normalize the input
-        name = arg_city_name.strip().lower()
-        city_to_iata = {
-            "delhi": "DEL",
-            "mumbai": "BOM",
-            "chennai": "MAA",
-            "bengaluru": "BLR",
-            "bangalore": "BLR",
-            "hyderabad": "HYD",
-            "kolkata": "CCU",
-            "ahmedabad": "AMD"
-        }
-        
-        if name not in city_to_iata:
-            return "Invalid city name. Supported cities: Delhi, Mumbai, Chennai, Bengaluru, Bangalore, Hyderabad, Kolkata, Ahmedabad"
-        
-        city_iata = city_to_iata[name]
-        
-        url = f'http://api.aviationstack.com/v1/flights?access_key={aviation_key}&dep_iata=DEL&arr_iata={city_iata}&flight_date={my_date}'
-        try:
-            response = requests.get(url, timeout=10)
-            return response.json()
-        except Exception as e:
-            return f"Error fetching flight information: {str(e)}"
-    
-    return [search_tool, get_weather_data, flight_info_tool, addition]
+def new_thread_id():
+    """Full 128-bit random id, so sessions never share a thread"""
+    return f"trip-{uuid.uuid4().hex}"
 
-# Initialize agent
-def initialize_agent(gemini_key, weather_key, aviation_key, verbose=False):
+# Initialize agent (once per key set)
+@st.cache_resource
+def initialize_agent(gemini_key, weather_key, aviation_key):
     """Initialize the LangChain agent with all tools"""
     
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=gemini_key,
-        temperature=0.7
-    )
+    llm = get_chat_model("gemini-2.5-flash", temperature=0.7, api_key=gemini_key,
+                         rate_limiter=get_rate_limiter("gemini", gemini_key).for_langchain("interactive"))
     
     tools = create_tools(weather_key, aviation_key)
     
     agent = create_agent(
         model=llm,
         tools=tools,
-        system_prompt="You are a helpful travel assistant. Use the available tools to help users with weather information, flight searches, web searches, and calculations. Always provide clear and helpful responses."
+        system_prompt="You are a helpful travel assistant. Use the available tools to help users with weather information, flight searches, web searches, and calculations. Always provide clear and helpful responses.",
+        checkpointer=get_checkpointer()
     )
     
     return agent
@@ -179,9 +112,13 @@ def initialize_agent(gemini_key, weather_key, aviation_key, verbose=False):
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = new_thread_id()
+
 # Main UI
 st.title("✈️ AI-Powered Travel Assistant")
 st.markdown("Get weather information, flight details, and travel assistance using natural language queries.")
+st.caption(f"🔗 Thread ID: `{st.session_state.thread_id}`")
 
 # Check if API keys are available
 if not gemini_api_key or not weather_api_key or not aviation_api_key:
@@ -205,30 +142,29 @@ with col2:
 
 if clear_button:
     st.session_state.messages = []
+    # Drop the old conversation's checkpoints and start a fresh thread
+    get_checkpointer().delete_thread(st.session_state.thread_id)
+    st.session_state.thread_id = new_thread_id()
     st.rerun()
 
 if submit_button and user_query:
     with st.spinner("🤖 AI Assistant is processing your query..."):
         try:
-            # Initialize agent
-            agent = initialize_agent(gemini_api_key, weather_api_key, aviation_api_key, verbose_mode)
+            # Initialize agent (cached after the first request with these keys)
+            setup_started = time.perf_counter()
+            agent = initialize_agent(gemini_api_key, weather_api_key, aviation_api_key)
+            setup_s = time.perf_counter() - setup_started
+            
+            # Run on the shared event loop so independent tool calls run concurrently;
+            # earlier turns of this session come from the checkpointer
+            tool_timer = ToolTimingCallback()
+            inputs = {"messages": [{"role": "user", "content": user_query}]}
+            config = {"callbacks": [tool_timer], "configurable": {"thread_id": st.session_state.thread_id}}
             
-            # Capture output if verbose
-            if verbose_mode:
-                with capture_stdout() as captured:
-                    response = agent.invoke({
-                        "messages": [
-                            {"role": "user", "content": user_query}
-                        ]
-                    })
-                verbose_output = captured.getvalue()
-            else:
-                response = agent.invoke({
-                    "messages": [
-                        {"role": "user", "content": user_query}
-                    ]
-                })
-                verbose_output = None
+            response = run_async(agent.ainvoke(inputs, config=config))
+            
+            # Execution log from this run's own callback (not the shared stdout)
+            verbose_output = (tool_timer.log_text() or None) if verbose_mode else None
             
             # Extract final answer
             final_answer = "No answer found."
@@ -242,18 +178,28 @@ if submit_button and user_query:
             st.session_state.messages.append({
                 "query": user_query,
                 "response": final_answer,
-                "verbose": verbose_output
+                "verbose": verbose_output,
+                "setup_s": setup_s
             })
             
             # Display result
             st.markdown("### ✨ Response")
             st.info(f"**{final_answer}**")
+            st.caption(f"Agent setup: {setup_s * 1000:.1f} ms" + (" (cached)" if setup_s < 0.05 else " (built)"))
             
             # Show verbose logs if enabled
             if verbose_mode and verbose_output:
                 with st.expander("🔍 Detailed Execution Logs"):
                     st.code(verbose_output, language="text")
             
+            # Per-tool timing (overlapping start times mean the calls ran concurrently)
+            if verbose_mode and tool_timer.calls:
+                with st.expander("⏱️ Tool Timing", expanded=True):
+                    st.dataframe(pd.DataFrame(tool_timer.calls), hide_index=True, use_container_width=True)
+                    wall = max(c["start_s"] + c["duration_s"] for c in tool_timer.calls)
+                    total = sum(c["duration_s"] for c in tool_timer.calls)
+                    st.caption(f"{len(tool_timer.calls)} tool calls · {total:.2f}s of tool time in {wall:.2f}s wall time")
+            
         except Exception as e:
             st.error(f"❌ Error processing query: {str(e)}")
             with st.expander("🔍 Error Details"):
@@ -275,6 +221,36 @@ if st.session_state.messages:
                 with st.expander("🔍 Execution Logs"):
                     st.code(msg['verbose'], language="text")
 
+# Agent setup time per question (the first one builds the agent, later ones reuse it)
+setup_times = [m["setup_s"] for m in st.session_state.messages if "setup_s" in m]
+if setup_times:
+    st.sidebar.markdown("### 🏗️ Agent Setup")
+    warm = setup_times[1:]
+    st.sidebar.caption(
+        f"first request this session {setup_times[0] * 1000:.1f} ms"
+        + (f" · warm avg {sum(warm) / len(warm) * 1000:.1f} ms over {len(warm)} requests" if warm else "")
+    )
+
+# Tool cache stats (shared by all sessions, persisted across restarts)
+cache_stats = tool_cache().stats
+st.sidebar.markdown("### 🗄️ Tool Cache")
+st.sidebar.caption(
+    f"{cache_stats['hits']} hits · {cache_stats['coalesced']} coalesced · {cache_stats['misses']} API calls "
+    f"· weather TTL {WEATHER_TTL_S // 60} min · flights TTL {FLIGHT_TTL_S // 3600} h"
+)
+
+# Tool result size before and after shaping
+shaping_rows = shaping_stats.rows()
+if shaping_rows:
+    with st.sidebar.expander("📏 Tool Result Tokens"):
+        st.dataframe(pd.DataFrame(shaping_rows), hide_index=True, use_container_width=True)
+        before = sum(r["tokens_before"] for r in shaping_rows)
+        after = sum(r["tokens_after"] for r in shaping_rows)
+        st.caption(f"~{before:,} raw → ~{after:,} shaped tokens ({1 - after / max(before, 1):.0%} smaller)")
+
+# Token usage and estimated cost
+render_accounting_sidebar("day010_ai_travel_agent")
+
 # Footer
 st.markdown("---")
 st.markdown(
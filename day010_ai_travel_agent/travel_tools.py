@@ -0,0 +1,493 @@
+"""
+Async tools for the travel assistant.
+
+Tools are coroutines sharing one httpx.AsyncClient (one connection pool
+for WeatherStack and AviationStack). The agent runs on a process-wide
+background event loop, where LangChain's tool node executes all tool
+calls from one model turn concurrently. A multi-city question therefore
+costs about one API round trip instead of one per city.
+
+Weather and flight lookups go through a TTL cache persisted in SQLite,
+shared by every session, which also coalesces concurrent requests for the
+same key into one API call.
+
+The raw WeatherStack / AviationStack payloads are shaped before they
+reach the model: only the fields the assistant answers with are kept,
+flight lists are capped with a summary count, and the result is compact
+JSON. Token counts before and after shaping are tracked per tool.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import List, Optional, TypedDict
+
+import httpx
+from langchain.tools import tool
+from langchain_community.tools import DuckDuckGoSearchRun
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.context_compression import estimate_tokens
+from utils.rate_limiter import RETRYABLE_STATUS, acall_with_retry, get_rate_limiter
+
+CITY_TO_IATA = {
+    "delhi": "DEL",
+    "mumbai": "BOM",
+    "chennai": "MAA",
+    "bengaluru": "BLR",
+    "bangalore": "BLR",
+    "hyderabad": "HYD",
+    "kolkata": "CCU",
+    "ahmedabad": "AMD"
+}
+
+WEATHER_TTL_S = 10 * 60
+FLIGHT_TTL_S = 3 * 60 * 60
+MAX_FLIGHTS = 8
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "travel_cache.db")
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_client = None
+_cache = None
+_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide event loop the agent and its HTTP client live on."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="travel-agent-loop", daemon=True).start()
+        return _loop
+
+
+def http_client() -> httpx.AsyncClient:
+    """Shared AsyncClient; only used from the background loop."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_connections=20))
+        return _client
+
+
+def run_async(coro, timeout: float = None):
+    """
+    Run a coroutine on the background loop and wait for its result.
+
+    The caller's context variables (e.g. the accounting callback) are
+    carried over to the task.
+    """
+    loop = background_loop()
+    done = concurrent.futures.Future()
+
+    def finish(task):
+        if task.cancelled():
+            done.cancel()
+        elif task.exception() is not None:
+            done.set_exception(task.exception())
+        else:
+            done.set_result(task.result())
+
+    def start():
+        loop.create_task(coro).add_done_callback(finish)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return done.result(timeout)
+
+
+class ToolResultCache:
+    """
+    SQLite-backed TTL cache for API responses.
+
+    Concurrent lookups of a key that is being fetched wait for that fetch
+    instead of starting their own. Lookups run on the background loop,
+    so in-flight fetches are tracked with asyncio futures.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db_lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def _read(self, key: str):
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM tool_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _write(self, key: str, value, ttl_s: float) -> None:
+        now = time.time()
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, fetched_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now + ttl_s),
+            )
+            self._conn.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (now,))
+
+    async def get_or_fetch(self, key: str, ttl_s: float, fetch, cacheable=lambda value: True):
+        """
+        Return (value, origin, age_s) where origin is "cache" or "live".
+
+        Args:
+            key: Cache key
+            ttl_s: Seconds a fetched value stays fresh
+            fetch: Coroutine function producing the value
+            cacheable: Predicate deciding whether a fetched value is stored (skip API errors)
+        """
+        cached = self._read(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            value, fetched_at = cached
+            return value, "cache", time.time() - fetched_at
+        if key in self._in_flight:
+            self.stats["coalesced"] += 1
+            leader = self._in_flight[key]
+            # asyncio.wait never cancels the leader, even if this waiter is cancelled
+            await asyncio.wait([leader])
+            if leader.cancelled():
+                # The leading request was cancelled; fetch again (this caller may become the leader)
+                return await self.get_or_fetch(key, ttl_s, fetch, cacheable)
+            return leader.result(), "live (shared in-flight request)", 0.0
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await fetch()
+            if cacheable(value):
+                self._write(key, value, ttl_s)
+            future.set_result(value)
+            return value, "live", 0.0
+        except BaseException as e:
+            # Waiters must never be left pending, including when the leader is cancelled
+            if not isinstance(e, Exception):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved when nobody else was waiting
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+
+def tool_cache() -> ToolResultCache:
+    """Process-wide tool cache (persisted in travel_cache.db)."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = ToolResultCache()
+        return _cache
+
+
+def describe_origin(origin: str, age_s: float) -> str:
+    if origin != "cache":
+        return origin
+    minutes, seconds = divmod(int(age_s), 60)
+    return f"cache (fetched {minutes}m {seconds}s ago)" if minutes else f"cache (fetched {seconds}s ago)"
+
+
+def is_api_error(value) -> bool:
+    return not isinstance(value, dict) or "error" in value
+
+
+class WeatherResult(TypedDict):
+    city: str
+    country: str
+    local_time: str
+    temperature_c: Optional[float]
+    feels_like_c: Optional[float]
+    conditions: str
+    humidity_pct: Optional[int]
+    wind_kmph: Optional[float]
+    precip_mm: Optional[float]
+
+
+class Flight(TypedDict):
+    flight: str
+    airline: str
+    status: str
+    departs: str
+    arrives: str
+    terminal: Optional[str]
+    delay_min: Optional[int]
+
+
+class FlightResult(TypedDict):
+    route: str
+    date: str
+    total_flights: int
+    shown: int
+    by_status: dict
+    flights: List[Flight]
+
+
+def api_error_message(data) -> str:
+    """Human-readable message from a WeatherStack / AviationStack error payload."""
+    if not isinstance(data, dict):
+        return str(data)[:200]
+    error = data.get("error") or {}
+    return str(error.get("info") or error.get("message") or error.get("type") or error)[:200]
+
+
+def shape_weather(data: dict) -> WeatherResult:
+    """Project a WeatherStack /current response onto the fields the assistant uses."""
+    location = data.get("location") or {}
+    current = data.get("current") or {}
+    return {
+        "city": location.get("name", ""),
+        "country": location.get("country", ""),
+        "local_time": location.get("localtime", ""),
+        "temperature_c": current.get("temperature"),
+        "feels_like_c": current.get("feelslike"),
+        "conditions": ", ".join(current.get("weather_descriptions") or []),
+        "humidity_pct": current.get("humidity"),
+        "wind_kmph": current.get("wind_speed"),
+        "precip_mm": current.get("precip"),
+    }
+
+
+def _hhmm(timestamp) -> str:
+    # AviationStack times look like 2025-12-25T06:05:00+00:00 (local airport time)
+    return timestamp[11:16] if isinstance(timestamp, str) and len(timestamp) >= 16 else ""
+
+
+def shape_flights(data: dict, route: str, date: str, max_flights: int = MAX_FLIGHTS) -> FlightResult:
+    """
+    Project an AviationStack /flights response onto a short, sorted flight list.
+
+    Codeshare records (the same aircraft sold under another airline's
+    number) are dropped, so each physical flight appears once.
+    """
+    records = [r for r in data.get("data") or [] if not ((r.get("flight") or {}).get("codeshared"))]
+    records.sort(key=lambda r: (r.get("departure") or {}).get("scheduled") or "")
+    by_status = {}
+    for record in records:
+        status = record.get("flight_status") or "unknown"
+        by_status[status] = by_status.get(status, 0) + 1
+    flights = []
+    for record in records[:max_flights]:
+        departure = record.get("departure") or {}
+        arrival = record.get("arrival") or {}
+        flights.append({
+            "flight": (record.get("flight") or {}).get("iata") or "",
+            "airline": (record.get("airline") or {}).get("name") or "",
+            "status": record.get("flight_status") or "unknown",
+            "departs": _hhmm(departure.get("scheduled")),
+            "arrives": _hhmm(arrival.get("scheduled")),
+            "terminal": departure.get("terminal"),
+            "delay_min": departure.get("delay"),
+        })
+    return {
+        "route": route,
+        "date": date,
+        "total_flights": len(records),
+        "shown": len(flights),
+        "by_status": by_status,
+        "flights": flights,
+    }
+
+
+def compact_json(value) -> str:
+    """JSON without whitespace or null fields."""
+    def prune(v):
+        if isinstance(v, dict):
+            return {k: prune(x) for k, x in v.items() if x is not None and x != ""}
+        if isinstance(v, list):
+            return [prune(x) for x in v]
+        return v
+    return json.dumps(prune(value), ensure_ascii=False, separators=(",", ":"))
+
+
+class ShapingStats:
+    """Estimated tokens per tool result before (raw JSON) and after shaping."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_tool = {}
+
+    def record(self, tool_name: str, raw, shaped: str) -> None:
+        before = estimate_tokens(json.dumps(raw, ensure_ascii=False))
+        after = estimate_tokens(shaped)
+        with self._lock:
+            totals = self.by_tool.setdefault(tool_name, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+            totals["calls"] += 1
+            totals["tokens_before"] += before
+            totals["tokens_after"] += after
+        logger.debug("[shape] %s: ~%d -> ~%d tokens", tool_name, before, after)
+
+    def rows(self) -> list:
+        with self._lock:
+            return [dict(tool=name, **totals) for name, totals in self.by_tool.items()]
+
+
+shaping_stats = ShapingStats()
+
+
+class ToolTimingCallback(BaseCallbackHandler):
+    """Records when each tool call starts and how long it takes, relative to the first call."""
+
+    def __init__(self):
+        self.calls = []
+        self._running = {}
+        self._origin = None
+        self._lock = threading.Lock()
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        now = time.perf_counter()
+        with self._lock:
+            self._origin = self._origin or now
+            self._running[run_id] = (kwargs.get("name") or (serialized or {}).get("name") or "tool", input_str, now)
+
+    def _finish(self, run_id, status):
+        now = time.perf_counter()
+        with self._lock:
+            name, input_str, started = self._running.pop(run_id, ("tool", "", now))
+            call = {
+                "tool": name,
+                "input": input_str,
+                "start_s": round(started - self._origin, 3),
+                "duration_s": round(now - started, 3),
+                "status": status,
+            }
+            self.calls.append(call)
+        # Per-session output goes through `calls`; stdout is shared by every session on the loop
+        logger.debug("%s", self.format_call(call))
+
+    @staticmethod
+    def format_call(call: dict) -> str:
+        return (f"[tool] {call['tool']}({call['input']}) started +{call['start_s']:.2f}s, "
+                f"took {call['duration_s']:.2f}s ({call['status']})")
+
+    def log_text(self) -> str:
+        """This run's tool calls as log lines, in completion order."""
+        with self._lock:
+            return "\n".join(self.format_call(call) for call in self.calls)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, f"error: {error}")
+
+
+def create_tools(weather_key, aviation_key):
+    """Create all tools for the travel assistant"""
+
+    # Each API key has its own process-wide budget; throttled or flaky calls are retried with backoff
+    weather_limiter = get_rate_limiter("weatherstack", weather_key)
+    aviation_limiter = get_rate_limiter("aviationstack", aviation_key)
+
+    # Search tool
+    search_tool = DuckDuckGoSearchRun()
+
+    # Weather tool
+    @tool
+    async def get_weather_data(city: str) -> str:
+        """
+        This function fetches the current weather data for a given city
+
+        Args:
+            city: The name of the city to get weather for
+        """
+        async def request():
+            response = await http_client().get(
+                "https://api.weatherstack.com/current", params={"access_key": weather_key, "query": city}
+            )
+            if response.status_code in RETRYABLE_STATUS:
+                response.raise_for_status()
+            return response.json()
+
+        async def fetch():
+            return await acall_with_retry(request, limiter=weather_limiter)
+
+        try:
+            data, origin, age_s = await tool_cache().get_or_fetch(
+                f"weather:{city.strip().lower()}", WEATHER_TTL_S, fetch, lambda v: not is_api_error(v)
+            )
+            if is_api_error(data):
+                return f"Error fetching weather: {api_error_message(data)}"
+            result = compact_json({"source": describe_origin(origin, age_s), **shape_weather(data)})
+            shaping_stats.record("get_weather_data", data, result)
+            return result
+        except Exception as e:
+            return f"Error fetching weather: {str(e)}"
+
+    # Addition tool
+    @tool
+    def addition(a: str, b: str) -> str:
+        """
+        This function adds two numbers
+
+        Args:
+            a: First number as string
+            b: Second number as string
+        """
+        try:
+            return str(int(a) + int(b))
+        except ValueError:
+            return "Error: Invalid numbers provided"
+
+    # Flight info tool
+    @tool
+    async def flight_info_tool(arg_city_name: str, my_date: str) -> str:
+        """
+        This function suggests available flights from Delhi to the destination only if a travel date is provided.
+
+        Args:
+            arg_city_name: The destination city name
+            my_date: The travel date in YYYY-MM-DD format
+        """
+        # Normalize the input
+        name = arg_city_name.strip().lower()
+        if name not in CITY_TO_IATA:
+            return "Invalid city name. Supported cities: Delhi, Mumbai, Chennai, Bengaluru, Bangalore, Hyderabad, Kolkata, Ahmedabad"
+
+        arr_iata = CITY_TO_IATA[name]
+
+        async def request():
+            response = await http_client().get(
+                "http://api.aviationstack.com/v1/flights",
+                params={"access_key": aviation_key, "dep_iata": "DEL", "arr_iata": arr_iata,
+                        "flight_date": my_date},
+            )
+            if response.status_code in RETRYABLE_STATUS:
+                response.raise_for_status()
+            return response.json()
+
+        async def fetch():
+            return await acall_with_retry(request, limiter=aviation_limiter)
+
+        try:
+            data, origin, age_s = await tool_cache().get_or_fetch(
+                f"flights:DEL-{arr_iata}:{my_date.strip()}", FLIGHT_TTL_S, fetch, lambda v: not is_api_error(v)
+            )
+            if is_api_error(data):
+                return f"Error fetching flight information: {api_error_message(data)}"
+            shaped = shape_flights(data, f"DEL-{arr_iata}", my_date.strip())
+            result = compact_json({"source": describe_origin(origin, age_s), **shaped})
+            shaping_stats.record("flight_info_tool", data, result)
+            return result
+        except Exception as e:
+            return f"Error fetching flight information: {str(e)}"
+
+    return [search_tool, get_weather_data, flight_info_tool, addition]
@@ -2,12 +2,17 @@ import streamlit as st
 import os
 import requests
 from langchain.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
 import sys
 from io import StringIO
 import contextlib
 
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter, call_with_retry
+from utils.accounting import enable_accounting, render_accounting_sidebar
+
 # Page config
 st.set_page_config(
     page_title="AI Currency Converter",
@@ -15,6 +20,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day011_AI_BASED_CURRENCY_CONVERTOR")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -104,6 +112,8 @@ def capture_stdout():
 def create_currency_converter_tool(api_key):
     """Create the currency converter tool with the API key"""
     
+    limiter = get_rate_limiter("exchangerate", api_key)
+    
     @tool
     def currency_converter(amount: float, base: str, target: str) -> str:
         """Converts amount from base currency to target currency using real-time ExchangeRate API.
@@ -119,7 +129,7 @@ def create_currency_converter_tool(api_key):
         url = f"https://v6.exchangerate-api.com/v6/{api_key}/pair/{base}/{target}/{amount}"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = call_with_retry(requests.get, url, timeout=10, limiter=limiter)
             data = response.json()
             
             if data.get("result") == "success":
@@ -139,11 +149,8 @@ def create_currency_converter_tool(api_key):
 def initialize_agent(gemini_key, exchange_key, verbose=False):
     """Initialize the LangChain agent with currency converter tool"""
     
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-exp",
-        google_api_key=gemini_key,
-        temperature=0.2
-    )
+    llm = get_chat_model("gemini-2.0-flash-exp", temperature=0.2, api_key=gemini_key,
+                         rate_limiter=get_rate_limiter("gemini", gemini_key).for_langchain("interactive"))
     
     converter_tool = create_currency_converter_tool(exchange_key)
     
@@ -314,6 +321,9 @@ with tab3:
                     with st.expander("🔍 Execution Logs"):
                         st.code(msg['verbose'], language="text")
 
+# Token usage and estimated cost
+render_accounting_sidebar("day011_AI_BASED_CURRENCY_CONVERTOR")
+
 # Footer
 st.markdown("---")
 st.markdown(
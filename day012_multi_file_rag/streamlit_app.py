@@ -1,9 +1,9 @@
 import streamlit as st
+import sys
 import os
 import tempfile
 from langchain_community.document_loaders import CSVLoader, PyMuPDFLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, GoogleGenerativeAI
 from langchain_postgres import PGVector
 from langchain_tavily import TavilySearch
 from langchain_core.prompts import PromptTemplate
@@ -11,6 +11,13 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from urllib.parse import quote_plus
 import uuid
+import hashlib
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model, get_embeddings
+from utils.rate_limiter import get_rate_limiter, call_with_retry, retrying, RateLimitedEmbeddings
+from utils.accounting import enable_accounting, render_accounting_sidebar
 
 # Page config
 st.set_page_config(
@@ -19,6 +26,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day012_multi_file_rag")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -181,6 +191,12 @@ def format_chunks(relevant_chunks):
     """Format retrieved chunks into a single string"""
     return "\n\n".join(chunk.page_content for chunk in relevant_chunks)
 
+def chunk_id(chunk, index):
+    """Stable id for a chunk, so re-adding the same chunk overwrites instead of duplicating"""
+    source = str(chunk.metadata.get("source", ""))
+    digest = hashlib.sha256(f"{source}\x00{index}\x00{chunk.page_content}".encode("utf-8")).hexdigest()
+    return str(uuid.UUID(digest[:32]))
+
 def initialize_agent(documents, gemini_key, tavily_key, connection_string, collection):
     """Initialize the RAG agent with vector store"""
     
@@ -191,26 +207,24 @@ def initialize_agent(documents, gemini_key, tavily_key, connection_string, colle
     )
     chunks = text_splitter.split_documents(documents)
     
-    # Initialize embedding model
-    embedding_model = GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-001",
-        google_api_key=gemini_key
+    # Initialize embedding model (each embedding call is budgeted and retried on its own)
+    gemini_limiter = get_rate_limiter("gemini", gemini_key)
+    embedding_model = RateLimitedEmbeddings(
+        get_embeddings("models/gemini-embedding-001", api_key=gemini_key), gemini_limiter
     )
     
-    # Create vector store
-    vector_store = PGVector.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
+    # Create vector store; stable ids make re-adding chunks an upsert
+    vector_store = PGVector(
+        embeddings=embedding_model,
         connection=connection_string,
         collection_name=collection,
     )
+    vector_store.add_documents(chunks, ids=[chunk_id(chunk, i) for i, chunk in enumerate(chunks)])
     
     # Initialize LLM and tools
-    llm = GoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0,
-        google_api_key=gemini_key
-    )
+    # Chat model: the completion-style client ignores rate_limiter=
+    llm = retrying(get_chat_model("gemini-2.5-flash", temperature=0, api_key=gemini_key,
+                                  rate_limiter=gemini_limiter.for_langchain("interactive")))
     
     search_tool = TavilySearch(
         max_results=3,
@@ -261,7 +275,8 @@ Provide citations as well, if available.
     web_search_chain = (
         {
             "question": RunnablePassthrough(),
-            "web_results": lambda x: search_tool.invoke({"query": x})
+            "web_results": lambda x: call_with_retry(search_tool.invoke, {"query": x},
+                                                     limiter=get_rate_limiter("tavily", tavily_key))
         }
         | web_prompt
         | llm
@@ -392,6 +407,9 @@ if st.session_state.agent_initialized:
 else:
     st.info("👆 Please upload files and initialize the agent to start chatting!")
 
+# Token usage and estimated cost
+render_accounting_sidebar("day012_multi_file_rag")
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -4,11 +4,17 @@ from typing import TypedDict
 from langgraph.graph import START, END, StateGraph
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 import sys
 from io import StringIO, BytesIO
 import contextlib
 
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.llm_cache import get_llm_cache, cache_metrics
+from utils.accounting import enable_accounting, render_accounting_sidebar
+
 # Page config
 st.set_page_config(
     page_title="LangGraph DAG Workflow",
@@ -16,6 +22,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day013_langgraphDAG")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -64,6 +73,13 @@ model_name = st.sidebar.selectbox(
     help="Select the Gemini model to use"
 )
 show_graph = st.sidebar.toggle("Show Graph Visualization", value=True, help="Display the workflow graph")
+use_llm_cache = st.sidebar.toggle("Cache LLM Responses", value=True,
+                                  help="Reuse answers for repeated prompts instead of calling Gemini again")
+if use_llm_cache:
+    get_llm_cache("day013_langgraphDAG", backend="sqlite")
+    llm_cache_stats = cache_metrics("day013_langgraphDAG")
+    st.sidebar.caption(f"💾 LLM cache hit rate {llm_cache_stats['hit_rate']:.0%} "
+                       f"({llm_cache_stats['hits']} hits / {llm_cache_stats['misses']} misses)")
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
 st.sidebar.info("""
@@ -85,11 +101,13 @@ def capture_stdout():
 
 # Initialize LangGraph workflow
 @st.cache_resource
-def initialize_graph(_api_key, model):
+def initialize_graph(_api_key, model, use_cache):
     """Initialize the LangGraph workflow"""
     
-    # Create LLM
-    llm = ChatGoogleGenerativeAI(model=model, google_api_key=_api_key)
+    # Create LLM (the response cache is attached to this model only; False also ignores any global cache)
+    cache = get_llm_cache("day013_langgraphDAG", backend="sqlite") if use_cache else False
+    llm = get_chat_model(model, api_key=_api_key, cache=cache,
+                         rate_limiter=get_rate_limiter("gemini", _api_key).for_langchain("interactive"))
     
     # Define the functions
     def get_question(state: State) -> dict:
@@ -168,7 +186,7 @@ if st.button("🚀 Execute Workflow", type="primary"):
         with st.spinner("🔄 Executing LangGraph workflow..."):
             try:
                 # Initialize graph
-                graph = initialize_graph(gemini_api_key, model_name)
+                graph = initialize_graph(gemini_api_key, model_name, use_llm_cache)
                 
                 # Show graph visualization if enabled
                 if show_graph:
@@ -240,6 +258,9 @@ with st.expander("💡 Example Questions"):
     for i, eq in enumerate(example_questions, 1):
         st.markdown(f"{i}. {eq}")
 
+# Token usage and estimated cost
+render_accounting_sidebar("day013_langgraphDAG")
+
 # Footer
 st.markdown("---")
 st.markdown(
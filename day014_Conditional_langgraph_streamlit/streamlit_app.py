@@ -2,12 +2,18 @@ import streamlit as st
 import os
 from langgraph.graph import START, END, StateGraph
 from typing import TypedDict, Literal, Dict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
 import re
 import sys
 from io import StringIO
 import contextlib
 
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.llm_cache import get_llm_cache, cache_metrics
+from utils.accounting import enable_accounting, render_accounting_sidebar
+
 # Page config
 st.set_page_config(
     page_title="LangGraph Conditional Routing",
@@ -15,6 +21,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day014_Conditional_langgraph_streamlit")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -79,6 +88,13 @@ with st.sidebar.expander("View/Edit Knowledge Base", expanded=False):
 
 verbose_mode = st.sidebar.toggle("Verbose Mode", value=False, help="Show detailed execution logs")
 show_graph = st.sidebar.toggle("Show Graph Visualization", value=True, help="Display the workflow graph")
+use_llm_cache = st.sidebar.toggle("Cache LLM Responses", value=True,
+                                  help="Reuse answers for repeated prompts instead of calling Gemini again")
+llm_cache = get_llm_cache("day014_conditional_langgraph", backend="sqlite") if use_llm_cache else False
+if use_llm_cache:
+    llm_cache_stats = cache_metrics("day014_conditional_langgraph")
+    st.sidebar.caption(f"💾 LLM cache hit rate {llm_cache_stats['hit_rate']:.0%} "
+                       f"({llm_cache_stats['hits']} hits / {llm_cache_stats['misses']} misses)")
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
@@ -232,10 +248,9 @@ if st.button("🚀 Process Question", type="primary"):
         with st.spinner("🔄 Processing your question..."):
             try:
                 # Initialize LLM
-                llm = ChatGoogleGenerativeAI(
-                    model="gemini-2.0-flash-exp",
-                    google_api_key=gemini_api_key
-                )
+                # The response cache is attached to this model only; False also ignores any global cache
+                llm = get_chat_model("gemini-2.0-flash-exp", api_key=gemini_api_key, cache=llm_cache,
+                                     rate_limiter=get_rate_limiter("gemini", gemini_api_key).for_langchain("interactive"))
                 
                 # Initialize graph
                 graph = initialize_graph(llm, verbose=verbose_mode)
@@ -347,6 +362,9 @@ if st.button("🚀 Process Question", type="primary"):
                 with st.expander("🔍 Error Details"):
                     st.exception(e)
 
+# Token usage and estimated cost
+render_accounting_sidebar("day014_Conditional_langgraph_streamlit")
+
 # Footer
 st.markdown("---")
 st.markdown(
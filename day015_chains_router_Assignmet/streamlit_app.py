@@ -1,6 +1,5 @@
 import streamlit as st
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, SystemMessage
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, START, END
@@ -11,6 +10,12 @@ import sys
 from io import StringIO, BytesIO
 import contextlib
 
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.accounting import enable_accounting, render_accounting_sidebar
+
 # Page config
 st.set_page_config(
     page_title="LangGraph Math Agent",
@@ -18,6 +23,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day015_chains_router_Assignmet")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -111,10 +119,8 @@ def initialize_agent():
     """Initialize the LangGraph agent with tools"""
     
     # Create LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash-exp",
-        google_api_key=gemini_api_key
-    )
+    llm = get_chat_model("gemini-2.0-flash-exp", api_key=gemini_api_key,
+                         rate_limiter=get_rate_limiter("gemini", gemini_api_key).for_langchain("interactive"))
     
     # Bind tools to LLM
     tools = [divide, multiply]
@@ -330,6 +336,9 @@ with st.expander("📚 Session History"):
     else:
         st.info("No queries executed yet in this session")
 
+# Token usage and estimated cost
+render_accounting_sidebar("day015_chains_router_Assignmet")
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -1,12 +1,19 @@
 import streamlit as st
+import os
+import sys
 import uuid
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, ToolMessage
 from langgraph.graph import StateGraph, START, END, MessagesState
 from langgraph.prebuilt import tools_condition, ToolNode
 from langgraph.checkpoint.memory import MemorySaver
 
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.accounting import enable_accounting, render_accounting_sidebar
+
 # Page config
 st.set_page_config(
     page_title="LangGraph ReAct Agent",
@@ -14,6 +21,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day016_langgrapg_react_agent")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -129,7 +139,8 @@ def initialize_agent(api_key):
     """Initialize the LangGraph ReAct agent"""
     
     # Create LLM
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+    llm = get_chat_model("gemini-2.5-flash", api_key=api_key,
+                         rate_limiter=get_rate_limiter("gemini", api_key).for_langchain("interactive"))
     
     # Bind tools
     tools_list = [add, multiply, divide]
@@ -293,6 +304,9 @@ if prompt := st.chat_input("Ask me to solve a math problem..."):
                 })
                 st.exception(e)
 
+# Token usage and estimated cost
+render_accounting_sidebar("day016_langgrapg_react_agent")
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -1,8 +1,19 @@
 import streamlit as st
+import sys
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
+import time
+from response_cache import ResponseCache, DEFAULT_CACHE_PATH
+
+MAX_CACHE_TTL_HOURS = 24 * 30
+
+# Shared helpers live in day00_chains/utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "day00_chains"))
+from utils.llm_clients import get_chat_model
+from utils.rate_limiter import get_rate_limiter
+from utils.accounting import enable_accounting, render_accounting_sidebar
 
 # Page config
 st.set_page_config(
@@ -11,6 +22,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Token and cost accounting for every LLM call in this app
+enable_accounting("day01_sequential_chain")
+
 # Custom CSS for better styling
 st.markdown("""
     <style>
@@ -48,6 +62,21 @@ model_name = st.sidebar.selectbox(
     index=0,
     help="Select the Gemini model to use"
 )
+report_mode = st.sidebar.radio(
+    "Report mode",
+    ["Single prompt (streaming)", "Section-parallel"],
+    index=0,
+    help="Section-parallel writes an outline, then generates every H2 section concurrently"
+)
+st.sidebar.markdown("---")
+st.sidebar.markdown("### 💾 Response Cache")
+bypass_cache = st.sidebar.toggle("Bypass cache", value=False, help="Always call the model and skip the cache")
+cache_nonzero = st.sidebar.checkbox(
+    "Cache non-zero temperatures",
+    value=False,
+    help="Responses at temperature > 0 vary between runs; opt in to reuse them anyway"
+)
+cache_ttl_hours = st.sidebar.number_input("Cache TTL (hours)", min_value=1, max_value=MAX_CACHE_TTL_HOURS, value=24 * 7)
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
 st.sidebar.info("""
@@ -57,20 +86,47 @@ This app uses LangChain Sequential Chain:
 - 🔗 **Sequential**: Chains them together automatically
 """)
 
-# Initialize LLM
+# Initialize response cache (shared by all sessions)
 @st.cache_resource
+def initialize_cache(path: str):
+    """Open the disk-backed response cache once per process"""
+    return ResponseCache(path, ttl_seconds=MAX_CACHE_TTL_HOURS * 3600)
+
+response_cache = initialize_cache(DEFAULT_CACHE_PATH)
+use_cache = not bypass_cache and (temperature == 0 or cache_nonzero)
+
+cache_stats = response_cache.stats()
+st.sidebar.caption(
+    f"{'🟢 Active' if use_cache else '⚪ Off'} · {cache_stats['entries']} entries · "
+    f"{cache_stats['bytes'] / 1024:.0f} KB · {cache_stats['hits']} hits / {cache_stats['misses']} misses"
+)
+if temperature > 0 and not cache_nonzero and not bypass_cache:
+    st.sidebar.caption("Caching is skipped at temperature > 0 unless opted in above.")
+if st.sidebar.button("🗑️ Clear Cache"):
+    response_cache.clear()
+    st.rerun()
+
+# Helper function to serve a generation from the cache
+def cached_call(template: str, inputs: dict, generate):
+    """Return (text, from_cache); generate() only runs on a cache miss"""
+    if not use_cache:
+        return generate(), False
+    key = ResponseCache.make_key(template, inputs, model_name, temperature)
+    cached = response_cache.get(key, ttl_seconds=cache_ttl_hours * 3600)
+    if cached is not None:
+        return cached, True
+    text = generate()
+    response_cache.set(key, text)
+    return text, False
+
+# Initialize LLM
 def initialize_llm(model: str, temperature: float):
-    """Initialize the LLM with caching"""
-    return ChatGoogleGenerativeAI(model=model, temperature=temperature)
+    """Get the shared, process-wide cached LLM client"""
+    return get_chat_model(model, temperature=temperature,
+                          rate_limiter=get_rate_limiter("gemini").for_langchain("interactive"))
 
-# Initialize chains
-@st.cache_resource
-def initialize_chains(_llm):
-    """Initialize the report and summary chains"""
-    
-    # Report prompt
-    report_prompt = PromptTemplate.from_template(
-        """You are a public-health analyst.
+# Prompt templates (module-level so cache keys can hash them)
+REPORT_TEMPLATE = """You are a public-health analyst.
 Write a detailed, well-structured **markdown report** on the topic: "{topic}".
 
 Requirements:
@@ -81,11 +137,8 @@ Requirements:
 - End with a short "Key Terms" glossary
 
 Return only markdown text."""
-    )
-    
-    # Summary prompt
-    summary_prompt = PromptTemplate.from_template(
-        """You are a senior editor.
+
+SUMMARY_TEMPLATE = """You are a senior editor.
 Summarize the following report into exactly **5 numbered points (1–5)** in markdown.
 Each point should be one crisp sentence focusing on the most decision-relevant insights.
 
@@ -95,16 +148,116 @@ Report:
 ========
 
 Return only the 5 numbered lines."""
-    )
+
+OUTLINE_TEMPLATE = """You are a public-health analyst planning a markdown report on the topic: "{topic}".
+Write a compact outline with exactly one line per section, in this order:
+{sections}
+
+Format each line as "<Section>: <2-3 key points, comma separated>".
+Include India-urban context (income strata, food environment, sedentary work, women & children, metros vs tier-2).
+Return only the outline lines."""
+
+SECTION_TEMPLATE = """You are a public-health analyst writing one section of a markdown report on the topic: "{topic}".
+
+Full report outline (other sections are written separately; do not repeat their content):
+{outline}
+
+Write ONLY the section "{section}", starting with the heading "## {section}" (H3 subheadings allowed).
+Requirements:
+- Audience: intelligent non-experts (10th–12th grade clarity)
+- Balanced, evidence-informed (no citations needed), ~90–120 words
+- If the section is "Key Terms", write a short glossary as a bullet list
+
+Return only markdown text."""
+
+# Initialize chains
+@st.cache_resource
+def initialize_chains(_llm, model: str, temperature: float):
+    """Initialize the report and summary chains (cached per model and temperature, which _llm is built from)"""
+    
+    # Report prompt
+    report_prompt = PromptTemplate.from_template(REPORT_TEMPLATE)
+    
+    # Summary prompt
+    summary_prompt = PromptTemplate.from_template(SUMMARY_TEMPLATE)
     
     # Assemble chains
-    report_chain = report_prompt | _llm | StrOutputParser()
-    summary_chain = summary_prompt | _llm | StrOutputParser()
+    # The report is generated once and passed to the summary chain
+    report_chain = (report_prompt | _llm | StrOutputParser()).with_config(run_name="report_chain")
+    summary_chain = (summary_prompt | _llm | StrOutputParser()).with_config(run_name="summary_chain")
+    
+    return report_chain, summary_chain
+
+# Fixed report sections, in display order
+REPORT_SECTIONS = [
+    "Introduction",
+    "Prevalence & Trends",
+    "Key Drivers",
+    "Health & Economic Impact",
+    "Policy & City-Level Interventions",
+    "Case Snapshots",
+    "Data Gaps",
+    "Conclusion",
+    "Key Terms",
+]
+
+# Initialize section-parallel chains
+@st.cache_resource
+def initialize_section_chains(_llm, model: str, temperature: float):
+    """Initialize the outline and per-section chains for map-reduce reports (cached per model and temperature)"""
+    
+    # Outline prompt (shared context for every section)
+    outline_prompt = PromptTemplate.from_template(OUTLINE_TEMPLATE).partial(sections="\n".join(REPORT_SECTIONS))
+    
+    # Section prompt
+    section_prompt = PromptTemplate.from_template(SECTION_TEMPLATE)
     
-    # Sequential chain
-    final_chain = report_chain | summary_chain
+    outline_chain = (outline_prompt | _llm | StrOutputParser()).with_config(run_name="outline_chain")
+    section_chain = (section_prompt | _llm | StrOutputParser()).with_config(run_name="section_chain")
     
-    return report_chain, summary_chain, final_chain
+    return outline_chain, section_chain
+
+# Helper function for map-reduce report generation
+def generate_sectioned_report(topic: str, outline_chain, section_chain, config=None) -> str:
+    """Outline once, write every section concurrently, then stitch them in order"""
+    outline = outline_chain.invoke({"topic": topic}, config=config)
+    sections = section_chain.batch(
+        [{"topic": topic, "outline": outline, "section": name} for name in REPORT_SECTIONS],
+        config={**(config or {}), "max_concurrency": len(REPORT_SECTIONS)}
+    )
+    return f"# {topic}\n\n" + "\n\n".join(section.strip() for section in sections)
+
+# Callback that times the named stages of a chain run
+class StageTimer(BaseCallbackHandler):
+    """Records wall-clock seconds per named chain stage and counts LLM calls"""
+    
+    def __init__(self, stages):
+        self.stages = set(stages)
+        self.timings = {}
+        self.llm_calls = 0
+        self._started = {}
+    
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+    
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        if kwargs.get("name") in self.stages:
+            self._started[run_id] = (kwargs["name"], time.perf_counter())
+    
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self._started:
+            name, started = self._started.pop(run_id)
+            self.timings[name] = time.perf_counter() - started
+
+# Helper to note when the first chunk of a stream arrives
+def timed_stream(chunks, marks: dict, key: str):
+    """Yield chunks unchanged, recording the time of the first one in marks[key]"""
+    for chunk in chunks:
+        marks.setdefault(key, time.perf_counter())
+        yield chunk
 
 # Main UI
 st.title("📊 Sequential Chain Report Generator")
@@ -123,70 +276,152 @@ if st.button("🚀 Generate Report & Summary", type="primary"):
     if not topic.strip():
         st.error("Please enter a topic!")
     else:
-        with st.spinner("🔄 Generating report and summary..."):
-            try:
-                # Initialize LLM
-                llm = initialize_llm(model_name, temperature)
-                
-                # Initialize chains
-                report_chain, summary_chain, final_chain = initialize_chains(llm)
-                
-                # Execute the sequential chain
-                result = final_chain.invoke({"topic": topic})
-                
-                # Also get the intermediate report for display
-                with st.spinner("📝 Generating detailed report..."):
-                    report_result = report_chain.invoke({"topic": topic})
-                
-                # Display results
-                st.success("✅ Report and summary generation completed!")
-                
-                # Create tabs for organized output
-                tab1, tab2, tab3 = st.tabs(["📋 Summary (5 Points)", "📝 Full Report", "🔍 Both Results"])
-                
-                with tab1:
-                    st.markdown("### 📋 5-Point Summary")
-                    st.markdown(f"**Topic:** {topic}")
-                    st.markdown("---")
-                    st.markdown(result)
+        try:
+            # Initialize LLM
+            llm = initialize_llm(model_name, temperature)
+            
+            # Initialize chains
+            report_chain, summary_chain = initialize_chains(llm, model_name, temperature)
+            
+            timer = StageTimer(["summary_chain"])
+            config = {"callbacks": [timer]}
+            first_token = {}
+            status = st.status("📝 Generating detailed report...", expanded=False)
+            started = time.perf_counter()
+            
+            # Create tabs up front so tokens can be streamed into them
+            tab1, tab2, tab3 = st.tabs(["📝 Full Report", "📋 Summary (5 Points)", "🔍 Both Results"])
+            
+            # Generate the report once; the summary starts as soon as it completes
+            with tab1:
+                st.markdown("### 📝 Detailed Report")
+                st.markdown(f"**Topic:** {topic}")
+                st.markdown("---")
+                if report_mode == "Section-parallel":
+                    outline_chain, section_chain = initialize_section_chains(llm, model_name, temperature)
                     
-                    # Download button
-                    st.download_button(
-                        label="📥 Download Summary",
-                        data=result,
-                        file_name="summary.txt",
-                        mime="text/plain"
+                    def generate_report():
+                        with st.spinner(f"🧩 Writing {len(REPORT_SECTIONS)} sections in parallel..."):
+                            return generate_sectioned_report(topic, outline_chain, section_chain, config)
+                    
+                    report_result, report_cached = cached_call(
+                        OUTLINE_TEMPLATE + SECTION_TEMPLATE, {"topic": topic, "sections": REPORT_SECTIONS},
+                        generate_report
                     )
-                
-                with tab2:
-                    st.markdown("### 📝 Detailed Report")
-                    st.markdown(f"**Topic:** {topic}")
-                    st.markdown("---")
+                    first_token["report"] = time.perf_counter()
                     st.markdown(report_result)
-                    
-                    # Download button
-                    st.download_button(
-                        label="📥 Download Full Report",
-                        data=report_result,
-                        file_name="report.md",
-                        mime="text/markdown"
+                else:
+                    report_result, report_cached = cached_call(
+                        REPORT_TEMPLATE, {"topic": topic},
+                        lambda: st.write_stream(timed_stream(
+                            report_chain.stream({"topic": topic}, config=config), first_token, "report"
+                        ))
                     )
-                
-                with tab3:
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("### 📋 Summary")
-                        st.markdown(result)
-                    
-                    with col2:
-                        st.markdown("### 📝 Full Report")
+                    if report_cached:
+                        first_token["report"] = time.perf_counter()
                         st.markdown(report_result)
+                if report_cached:
+                    st.caption("⚡ Served from cache")
+            report_time = time.perf_counter() - started
+            report_calls = timer.llm_calls
+            
+            status.update(label="📋 Summarizing report...")
+            with tab2:
+                st.markdown("### 📋 5-Point Summary")
+                st.markdown(f"**Topic:** {topic}")
+                st.markdown("---")
+                result, summary_cached = cached_call(
+                    SUMMARY_TEMPLATE, {"report": report_result},
+                    lambda: st.write_stream(timed_stream(
+                        summary_chain.stream({"report": report_result}, config=config), first_token, "summary"
+                    ))
+                )
+                if summary_cached:
+                    st.markdown(result)
+                    st.caption("⚡ Served from cache")
+            total_time = time.perf_counter() - started
+            status.update(label="✅ Report and summary generation completed!", state="complete")
+            
+            # Download buttons
+            with tab1:
+                st.download_button(
+                    label="📥 Download Full Report",
+                    data=report_result,
+                    file_name="report.md",
+                    mime="text/markdown"
+                )
+            
+            with tab2:
+                st.download_button(
+                    label="📥 Download Summary",
+                    data=result,
+                    file_name="summary.txt",
+                    mime="text/plain"
+                )
+            
+            with tab3:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown("### 📋 Summary")
+                    st.markdown(result)
                 
-            except Exception as e:
-                st.error(f"❌ Error generating content: {str(e)}")
-                with st.expander("🔍 Error Details"):
-                    st.exception(e)
+                with col2:
+                    st.markdown("### 📝 Full Report")
+                    st.markdown(report_result)
+            
+            # Timing panel
+            with st.expander("⏱️ Timing", expanded=False):
+                t1, t2, t3, t4, t5 = st.columns(5)
+                t1.metric("First report token", f"{first_token.get('report', started) - started:.1f}s")
+                t2.metric("Report", f"{report_time:.1f}s")
+                t3.metric("Summary", f"{timer.timings.get('summary_chain', 0.0):.1f}s")
+                t4.metric("Total", f"{total_time:.1f}s")
+                summary_calls = timer.llm_calls - report_calls
+                t5.metric("LLM calls", timer.llm_calls,
+                          help=f"Report: {report_calls} · Summary: {summary_calls} (cache hits make no calls)")
+                if report_calls:
+                    st.caption(f"Reusing the generated report for the summary avoided regenerating it: "
+                               f"{report_calls} LLM call{'s' if report_calls > 1 else ''}, roughly {report_time:.1f}s.")
+                else:
+                    st.caption("The report was served from the cache, so no report generation was needed.")
+            
+        except Exception as e:
+            st.error(f"❌ Error generating content: {str(e)}")
+            with st.expander("🔍 Error Details"):
+                st.exception(e)
+
+# Benchmark: single prompt vs section-parallel
+st.markdown("---")
+with st.expander("⚖️ Benchmark Report Modes"):
+    st.markdown("Generates the report for the topic above in both modes and compares time-to-complete.")
+    if st.button("Run Benchmark"):
+        try:
+            llm = initialize_llm(model_name, temperature)
+            report_chain, _ = initialize_chains(llm, model_name, temperature)
+            outline_chain, section_chain = initialize_section_chains(llm, model_name, temperature)
+            timings = []
+            
+            with st.spinner("⏱️ Single prompt..."):
+                started = time.perf_counter()
+                single_report = report_chain.invoke({"topic": topic})
+                timings.append({"mode": "Single prompt", "seconds": round(time.perf_counter() - started, 1),
+                                "words": len(single_report.split())})
+            
+            with st.spinner("⏱️ Section-parallel..."):
+                started = time.perf_counter()
+                sectioned_report = generate_sectioned_report(topic, outline_chain, section_chain)
+                timings.append({"mode": "Section-parallel", "seconds": round(time.perf_counter() - started, 1),
+                                "words": len(sectioned_report.split())})
+            
+            st.dataframe(timings, hide_index=True, use_container_width=True)
+            speedup = timings[0]["seconds"] / max(timings[1]["seconds"], 0.1)
+            st.metric("Section-parallel speed-up", f"{speedup:.1f}×")
+        except Exception as e:
+            st.error(f"❌ Benchmark failed: {str(e)}")
+
+# Token usage and estimated cost
+render_accounting_sidebar("day01_sequential_chain")
 
 # Footer
 st.markdown("---")